@@ -0,0 +1,190 @@
+import queue
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from State2 import State
+from Engine import Engine
+from Agent_Core import AgentCore
+from Model import DQN, DQNLearner, compile_learner
+from Replay_Buffer import make_buffer
+from Game_Stats import GameStats
+from CONSTANTS import *
+
+
+def actor_process(actor_id, shared_model, weights_version, episodes, transitions_queue, stop_event, seed):
+    # תהליך שחקן: משחק בלי מסך עם עותק מקומי של המודל ושולח את החוויות ל learner
+    # seed הוא SeedSequence משלו לכל שחקן, ממנו נגזרים זרמים נפרדים לבלוקים ולאפסילון
+    torch.set_num_threads(1)
+    env_seed, agent_seed = seed.spawn(2)
+    torch.manual_seed(int(seed.generate_state(1)[0]))
+
+    model = DQN()
+    model.load_state_dict(shared_model.state_dict())
+    local_version = weights_version.value
+    player = AgentCore(model=model, train=True, seed=agent_seed)
+    env = Engine(State(), log=None, seed=env_seed)
+
+    pending = []  # חוויות שעוד לא נשלחו
+
+    def send():  # שולח את החוויות כמערכי numpy (זול יותר מטנסורים בזיכרון משותף עבור באצ'ים קטנים)
+        if not pending:
+            return
+        states, actions, rewards, next_states, dones = zip(*pending)
+        transitions_queue.put(("transitions", (
+            np.stack(states), np.array(actions, dtype=np.float32), np.array(rewards, dtype=np.float32),
+            np.stack(next_states), np.array(dones, dtype=np.float32),
+        )))
+        pending.clear()
+
+    env.reset()
+    episode_start = time.perf_counter()
+    while not stop_event.is_set():
+        if weights_version.value != local_version:  # סנכרון משקלים מה learner
+            local_version = weights_version.value
+            model.load_state_dict(shared_model.state_dict())
+
+        epoch = episodes.value  # האפסילון נקבע לפי מספר המשחקים של כל השחקנים יחד
+        state = env.state.copy()
+        action, _ = player.get_action_train(state=env.state, epoch=epoch)
+        env.move(env.state, action)
+        done = env.is_game_over(env.state)
+        reward = env.Get_Reward_Args(env.state, action)
+
+        block, (grid_x, grid_y) = action
+        pending.append((
+            state.Board.astype(np.uint8), (grid_x, grid_y), (reward,),
+            env.state.Board.astype(np.uint8), (done,),
+        ))
+        if len(pending) >= ACTOR_SEND_EVERY:
+            send()
+
+        if done:
+            send()
+            with episodes.get_lock():
+                episodes.value += 1
+            # התוצאות של המשחק, ה learner שומר אותן ב game_stats.db
+            state = env.state
+            transitions_queue.put(("episode", (state.score, state.lines_cleared, state.moves, state.max_combo,
+                                               time.perf_counter() - episode_start)))
+            env.reset()
+            episode_start = time.perf_counter()
+    send()
+
+
+class ActorLearner:
+    def __init__(self, num_actors=NUM_ACTORS, model_number=DEFAULT_MODEL_NUMBER, seed=0):
+        self.num_actors = num_actors
+        self.model_number = model_number
+        self.seed = seed
+
+    def train(self, epochs=NUM_EPOCHS):
+        Model_Path = MODEL_PATH_TEMPLATE.format(self.model_number)  # נתיב לשמירת המודל
+        ctx = mp.get_context("spawn")
+
+        player = AgentCore(train=True)  # המודל שהלומד מאמן
+        player_hat = AgentCore(train=False)  # מודל יעד (target network)
+        player_hat.model.load_state_dict(player.model.state_dict())
+        learner = compile_learner(DQNLearner(player.model, player_hat.model))
+
+        shared_model = DQN()  # המשקלים שהשחקנים קוראים, בזיכרון משותף
+        shared_model.load_state_dict(player.model.state_dict())
+        shared_model.share_memory()
+        weights_version = ctx.Value("i", 0)
+        episodes = ctx.Value("i", 0)
+        transitions_queue = ctx.Queue(maxsize=self.num_actors * 16)
+        stop_event = ctx.Event()
+
+        streams = np.random.SeedSequence(self.seed).spawn(self.num_actors + 1)  # זרם בלתי תלוי לכל שחקן, והאחרון לדגימה מה buffer
+        actors = [
+            ctx.Process(target=actor_process, args=(i, shared_model, weights_version, episodes,
+                                                    transitions_queue, stop_event, streams[i]), daemon=True)
+            for i in range(self.num_actors)
+        ]
+        for actor in actors:
+            actor.start()
+
+        buffer = make_buffer(path=None, seed=streams[-1])  # ה buffer והאופטימייזר שייכים רק ל learner
+        stats = GameStats()
+        optim = torch.optim.Adam(player.model.parameters(), lr=LEARNING_RATE)
+        scheduler = torch.optim.lr_scheduler.MultiStepLR(optim, [m*1000 for m in LR_SCHEDULER_MILESTONES], gamma=LR_SCHEDULER_GAMMA)
+
+        step, received, finished = 0, 0, 0  # צעדי למידה, חוויות שהתקבלו, משחקים שנגמרו
+        scores, losses = [], []
+        target_epoch = 0
+        report_start = time.perf_counter()
+        report_step, report_received, report_finished = 0, 0, 0
+
+        try:
+            while finished < epochs:
+                # קורא מהתור מספר חסום של הודעות בלי לחכות, כדי שהלמידה לא תעצור בגלל השחקנים
+                for _ in range(self.num_actors * 2):
+                    try:
+                        kind, payload = transitions_queue.get(block=len(buffer) < MIN_BUFFER_SIZE_FOR_TRAINING, timeout=1)
+                    except queue.Empty:
+                        break
+                    if kind == "episode":
+                        finished += 1
+                        scores.append(payload[0])
+                        stats.add(*payload, model_number=self.model_number)  # score, lines_cleared, moves, max_combo, duration
+                        if finished % 100 == 0:
+                            torch.save(player.model.state_dict(), Model_Path)  # שמירת המודל
+                    else:
+                        buffer.push_batch(*(torch.from_numpy(a) for a in payload))
+                        received += len(payload[0])
+
+                if len(buffer) < MIN_BUFFER_SIZE_FOR_TRAINING:
+                    continue
+
+                weights = None  # משקלי importance sampling, רק ב buffer עם עדיפויות
+                if buffer.prioritized:
+                    states, actions, rewards, next_states, dones, indices, weights = buffer.sample(BATCH_SIZE)
+                else:
+                    states, actions, rewards, next_states, dones = buffer.sample(BATCH_SIZE)  # דגימה מה buffer
+                loss, td_errors = learner(states, rewards, next_states, dones, weights)
+                if buffer.prioritized:  # עדכון העדיפויות של כל הבאצ' בבת אחת
+                    buffer.update_priorities(indices, td_errors.numpy())
+                losses.append(loss.item())
+                loss.backward()
+                optim.step()
+                optim.zero_grad()
+                scheduler.step()
+                step += 1
+
+                if finished // NETWORK_UPDATE_FREQUENCY != target_epoch:  # כל C משחקים מעדכנים את מודל היעד
+                    target_epoch = finished // NETWORK_UPDATE_FREQUENCY
+                    player_hat.model.load_state_dict(player.model.state_dict())
+
+                if step % ACTOR_SYNC_EVERY == 0:  # פרסום המשקלים החדשים לשחקנים
+                    shared_model.load_state_dict(player.model.state_dict())
+                    with weights_version.get_lock():
+                        weights_version.value += 1
+
+                elapsed = time.perf_counter() - report_start
+                if elapsed >= THROUGHPUT_REPORT_SECONDS:
+                    print(f"\n=== Episodes {finished}/{epochs} | {self.num_actors} actors ===")
+                    print(f"Env steps/sec: {(received - report_received) / elapsed:.1f}")
+                    print(f"Learner steps/sec: {(step - report_step) / elapsed:.1f}")
+                    print(f"Episodes/sec: {(finished - report_finished) / elapsed:.2f}")
+                    print(f"Avg Score (last 100): {sum(scores[-100:]) / max(len(scores[-100:]), 1):.2f}")
+                    print(f"Avg Loss (last 100): {sum(losses[-100:]) / max(len(losses[-100:]), 1):.6f}")
+                    print(f"Buffer Size: {len(buffer)}")
+                    report_start = time.perf_counter()
+                    report_step, report_received, report_finished = step, received, finished
+        finally:
+            stop_event.set()
+            # מרוקן את התור כדי שהשחקנים לא ייתקעו על put
+            while any(actor.is_alive() for actor in actors):
+                try:
+                    transitions_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            for actor in actors:
+                actor.join()
+            stats.close()
+            torch.save(player.model.state_dict(), Model_Path)  # שמירת המודל
+
+
+if __name__ == "__main__":
+    trainer = ActorLearner()
+    trainer.train()
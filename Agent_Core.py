@@ -0,0 +1,171 @@
+import os
+import pickle
+import torch
+import numpy as np
+import copy
+import Bitboard
+from State2 import State
+from Engine import Engine
+from Model import DQN
+from Profiler import StageTimer
+from Q_Cache import QCache
+from CONSTANTS import *
+
+_loaded_models = {}  # מטמון של מודלים שכבר נטענו מקובץ, לפי נתיב וזמן השינוי של הקובץ
+
+
+def load_weights(file):  # טוען קובץ משקלים פעם אחת ומחזיר את אותו מודל בטעינות הבאות, כל עוד הקובץ לא השתנה
+    key = (os.path.abspath(file), os.path.getmtime(file))
+    model = _loaded_models.get(key)
+    if model is None:
+        try:
+            # רק טנסורים (בלי להריץ קוד pickle), ממופים לזיכרון במקום להיקרא כולם מהדיסק
+            state_dict = torch.load(file, map_location="cpu", weights_only=True, mmap=True)
+        except pickle.UnpicklingError:  # קבצים ישנים שנשמרו כמודל שלם ולא כ state_dict
+            state_dict = torch.load(file, map_location="cpu", weights_only=False)
+            if isinstance(state_dict, torch.nn.Module):
+                state_dict = state_dict.state_dict()
+        model = DQN()
+        model.load_state_dict(state_dict, assign=True)  # המודל משתמש בטנסורים שנטענו בלי להעתיק אותם
+        model.eval()
+        _loaded_models[key] = model
+    return model
+
+
+class AgentCore:  # סוכן DQN שעובד בקואורדינטות גריד בלבד, בלי pygame
+    def __init__(self, model=None, train=True, env=None, q_cache_size=Q_CACHE_SIZE, seed=None):
+        self._model = model  # המודל נוצר רק כשצריך אותו, כדי שסוכן שטוען מודל מקובץ לא יבנה אחד לשווא
+        self.selected_block = None
+        self.env = env if env is not None else Engine(State())
+        self.train = train
+        self.rng = np.random.default_rng(seed)  # מחולל משלו לבחירות האקראיות של אפסילון
+        self.timer = StageTimer(enabled=False)  # טיימרים לשלבים של בחירת מהלך, האימון מחליף בטיימר שלו
+        # ערכי קיו של לוחות שכבר הוערכו. רק מחוץ לאימון, שבו המשקלים משתנים בכל צעד
+        self.q_cache = QCache(q_cache_size) if q_cache_size > 0 and not train else None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = DQN()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        
+    # חישוב Q לערכי מצבים ופעולות
+    def Q (self, states, actions):
+        Q_values = self.model(states)
+        return Q_values
+    
+    # מחשב את ערכי הקיו של כל המצבים ובוחר את הפעולה הכי טובה
+    def get_Actions_Values(self, next_states):
+        with torch.no_grad():
+            q_values = self.model(next_states)
+        best_actions = torch.argmax(q_values, dim=1, keepdim=True)
+        return best_actions, q_values
+
+    def board_values(self, boards):  # ערכי הקיו של מערך לוחות (N, 64), דרך המטמון אם הוא פעיל
+        if self.q_cache is not None:
+            return self.q_cache.values(self.model, boards)
+        with torch.no_grad():
+            return self.model(torch.from_numpy(boards.astype(np.float32)).view(-1, 1, 8, 8)).view(-1).numpy()
+
+    def get_action (self, state, events=None, epoch=0):
+        action, _ = self.get_action_train(state, epoch)
+        return action
+
+    def get_action_train(self, state, epoch=0):
+        with self.timer.stage("moves"):
+            moves = self.get_all_moves(state)
+        with self.timer.stage("after_states"):
+            after_state_tensors = self.get_after_states(moves, state)
+                
+        if self.train and self.rng.random() < self.get_epsilon(epoch):
+            best_idx = int(self.rng.integers(len(moves)))
+            best_move = moves[best_idx]
+            return self.move_to_action(best_move),  after_state_tensors[best_idx]   
+        
+        with self.timer.stage("forward"):
+            if self.q_cache is not None:  # לוחות כפולים ולוחות שכבר הוערכו עם אותם משקלים לא עוברים ברשת
+                boards = after_state_tensors.view(-1, 64).numpy().astype(np.uint8)
+                best_idx = int(np.argmax(self.board_values(boards)))
+            else:
+                with torch.no_grad():
+                    best_idx = torch.argmax(self.model(after_state_tensors))
+
+        best_move = moves[best_idx]
+        best_after_state_tensor = after_state_tensors[best_idx] 
+        action = self.move_to_action(best_move)
+        return action, best_after_state_tensor
+      
+    def get_all_moves (self, state):
+        moves = []
+        if self.env.bitboard:
+            # המיקומים החוקיים של כל בלוק נלקחים מהמטמון של המצב (טבלת מסכות מוכנה מראש)
+            legal = self.env.legal_cache(state)
+            for block in state.Blocks:
+                positions = Bitboard.mask_table(block.shape)[1]
+                for i in np.flatnonzero(legal[block]).tolist():
+                    moves.append((block, positions[i]))
+            return moves
+
+        for block in state.Blocks:
+            shape_h = len(block.shape)
+            shape_w = len(block.shape[0]) if shape_h > 0 else 0
+            
+            max_y = state.Board.shape[0] - shape_h
+            max_x = state.Board.shape[1] - shape_w
+            if max_y < 0 or max_x < 0:
+                continue
+
+            for y in range(0, max_y + 1):
+                for x in range(0, max_x + 1):
+                    if self.env.is_valid_move(state, block, (x, y)):
+                        moves.append((block, (x, y)))
+        return moves
+
+    def get_after_states (self, moves, state):
+        if self.env.bitboard:
+            # כל המצבים נכתבים לטנסור אחד בלי deepcopy של המצב
+            after_tensors, _ = self.env.BatchAfterStates(state, moves)
+            return after_tensors
+
+        after_states = []
+        for move in moves:
+                block, pos = move
+                grid_x, grid_y = pos
+                
+                new_state = copy.deepcopy(state)
+                self.env.fix_block_to_board(new_state, block, pos)
+                self.env.check_and_explode_rows(new_state)
+                
+                if not new_state.Blocks:
+                    self.env.set_random_block(new_state)
+                
+                state_tensor = new_state.TensorState(new_state.Board)
+                state_tensor = state_tensor.view(1, 8, 8)
+                after_states.append(state_tensor)
+        
+        after_tensors = torch.stack(after_states, dim=0)
+        return after_tensors
+    
+    def move_to_action (self, best_move): # בליבה הפעולה נשארת בקואורדינטות גריד
+        block, (grid_x, grid_y) = best_move
+        
+        self.selected_block = block
+        
+        return (block, (grid_x, grid_y))
+    
+    def get_epsilon (self, epoch = 0, start=EPSILON_START, end=EPSILON_END, decay = EPSILON_DECAY):
+        if epoch > decay:
+            return end
+        return start - (end - start) * (epoch / decay)
+        
+    def load_model(self, file):
+        if self.train:  # באימון לכל סוכן יש פרמטרים משלו שהאופטימייזר מעדכן
+            self.model.load_state_dict(load_weights(file).state_dict())
+            if self.q_cache is not None:
+                self.q_cache.invalidate()
+        else:  # במשחק כל הסוכנים חולקים את המודל מהמטמון
+            self.model = load_weights(file)
\ No newline at end of file
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+from State2 import State
+from Engine import Engine
+from Agent_Core import AgentCore
+from Model import DQN, DQNLearner, compile_learner
+from Replay_Buffer import make_buffer
+from CONSTANTS import *
+
+
+class Benchmark:  # מדידת מהירות של הנתיבים החמים בלי מסך, עם זרע קבוע כדי שריצות יהיו ברות השוואה
+    def __init__(self, seed=BENCHMARK_SEED, seconds=BENCHMARK_SECONDS, buffer_sizes=BENCHMARK_BUFFER_SIZES):
+        self.seed = seed
+        self.seconds = seconds  # כמה זמן מודדים כל בדיקה
+        self.buffer_sizes = buffer_sizes
+        self.results = {}
+
+    def seed_all(self):  # כל בדיקה מתחילה מאותו זרע, בלי תלות בבדיקות שרצו לפניה
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        torch.manual_seed(self.seed)
+
+    def record(self, name, value, unit, higher_is_better=True):
+        self.results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+        print(f"{name:<40} {value:>14.1f} {unit}")
+
+    def rate(self, fn):  # מריץ את fn שוב ושוב במשך self.seconds, fn מחזירה כמה יחידות עבודה עשתה. מחזיר יחידות לשנייה
+        fn()  # חימום
+        units, start = 0, time.perf_counter()
+        while True:
+            units += fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.seconds:
+                return units / elapsed
+
+    def latencies(self, fn):  # זמני ריצה בודדים של fn במיקרו שניות, במשך self.seconds
+        fn()  # חימום
+        times, start = [], time.perf_counter()
+        while time.perf_counter() - start < self.seconds:
+            t = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t) * 1e6)
+        return np.array(times)
+
+    def random_move(self, agent, state):  # מהלך אקראי, בסדר קבוע של הבלוקים (סדר הסט תלוי בכתובות בזיכרון)
+        moves = agent.get_all_moves(state)
+        moves.sort(key=lambda move: (move[0].color_id, move[1]))
+        return random.choice(moves)
+
+    def sample_states(self, count=BENCHMARK_STATES):  # מצבים מאמצע משחקים אקראיים, כדי שהלוחות לא יהיו ריקים
+        self.seed_all()
+        env = Engine(State(), log=None, seed=self.seed)
+        agent = AgentCore(train=False, env=env)
+        env.reset()
+        states = []
+        while len(states) < count:
+            env.move(env.state, self.random_move(agent, env.state))
+            if env.is_game_over(env.state):
+                env.reset()
+            else:
+                states.append(env.state.copy())
+        return states
+
+    def bench_moves(self, states):
+        env = Engine(State(), log=None)
+        i = iter(range(sys.maxsize))
+        self.record("get_all_possible_moves", self.rate(
+            lambda: len(env.GetAllPossibleMoves(states[next(i) % len(states)]))), "moves/s")
+
+    def bench_after_states(self, states):
+        env = Engine(State(), log=None)
+        moves = [env.GetAllPossibleMoves(state) for state in states]
+        i = iter(range(sys.maxsize))
+
+        def after_state():
+            k = next(i) % len(states)
+            return len(env.AfterState(states[k], moves[k]))
+        self.record("after_state", self.rate(after_state), "after-states/s")
+
+        agent = AgentCore(train=False, env=env)
+        agent_moves = [agent.get_all_moves(state) for state in states]
+
+        def agent_after_states():
+            k = next(i) % len(states)
+            return len(agent.get_after_states(agent_moves[k], states[k]))
+        self.record("agent_get_after_states", self.rate(agent_after_states), "after-states/s")
+
+    def bench_random_play(self, states):
+        self.seed_all()
+        env = Engine(State(), log=None, seed=self.seed)
+        agent = AgentCore(train=False, env=env)
+
+        def game():
+            env.reset()
+            while not env.is_game_over(env.state):
+                env.move(env.state, self.random_move(agent, env.state))
+            return 1
+        self.record("random_play", self.rate(game), "games/s")
+
+    def bench_engine_step(self, states):  # צעד מלא של הסביבה: כל המהלכים, מהלך, תגמול ובדיקת סוף משחק
+        for bitboard in (True, False):
+            self.seed_all()
+            env = Engine(State(), bitboard=bitboard, log=None, seed=self.seed)
+            env.reset()
+
+            def step():
+                state = env.state
+                moves = env.GetAllPossibleMoves(state)
+                blocks = {id(block.shape): block for block in sorted(state.Blocks, key=lambda block: block.color_id)}
+                while True:  # מהלך אקראי של אחד הבלוקים הנוכחיים, בלי לעבור על כל המהלכים
+                    _, shape, pos = moves[random.randrange(len(moves))]
+                    if id(shape) in blocks:
+                        break
+                action = (blocks[id(shape)], pos)
+                env.move(state, action)
+                env.Get_Reward_Args(state, action)
+                if env.is_game_over(env.state):
+                    env.reset()
+                return 1
+            self.record(f"engine_step[{'bitboard' if bitboard else 'array'}]", self.rate(step), "steps/s")
+
+    def fill_buffer(self, buffer, size):  # ממלא את ה buffer במעברים אקראיים בבאצ'ים
+        generator = torch.Generator().manual_seed(self.seed)
+        for start in range(0, size, 10000):
+            n = min(10000, size - start)
+            buffer.push_batch(
+                torch.randint(0, 4, (n, 8, 8), dtype=torch.uint8, generator=generator),
+                torch.randint(0, 8, (n, 2), generator=generator).float(),
+                torch.rand((n, 1), generator=generator),
+                torch.randint(0, 4, (n, 8, 8), dtype=torch.uint8, generator=generator),
+                (torch.rand((n, 1), generator=generator) < 0.05).float(),
+            )
+
+    def bench_buffer_sample(self, states):
+        for storage in BENCHMARK_BUFFER_STORAGES:
+            for size in self.buffer_sizes:
+                self.seed_all()
+                with tempfile.TemporaryDirectory() as directory:
+                    if storage == "memmap":
+                        buffer = make_buffer(storage, capacity=size, path=directory)
+                    else:
+                        buffer = make_buffer(storage, capacity=size, seed=self.seed)
+                    self.fill_buffer(buffer, size)
+                    times = self.latencies(lambda: buffer.sample(BATCH_SIZE))
+                    del buffer  # סוגר את קבצי ה memmap לפני מחיקת התיקייה
+                self.record(f"buffer_sample[{storage},{size}].p50", float(np.percentile(times, 50)), "us", higher_is_better=False)
+                self.record(f"buffer_sample[{storage},{size}].p95", float(np.percentile(times, 95)), "us", higher_is_better=False)
+
+    def bench_learner(self, states):
+        self.seed_all()
+        online, target = DQN(), DQN()
+        target.load_state_dict(online.state_dict())
+        learner = compile_learner(DQNLearner(online, target))
+        optim = torch.optim.Adam(online.parameters(), lr=LEARNING_RATE)
+        buffer = make_buffer("tensor", capacity=10000)
+        self.fill_buffer(buffer, 10000)
+
+        def step():
+            states, actions, rewards, next_states, dones = buffer.sample(BATCH_SIZE)
+            loss, _ = learner(states, rewards, next_states, dones)
+            loss.backward()
+            optim.step()
+            optim.zero_grad()
+            return 1
+        self.record("learner_step", self.rate(step), "steps/s")
+
+    BENCHMARKS = {
+        "moves": bench_moves,
+        "after_states": bench_after_states,
+        "random_play": bench_random_play,
+        "engine_step": bench_engine_step,
+        "buffer_sample": bench_buffer_sample,
+        "learner": bench_learner,
+    }
+
+    def run(self, names=None):
+        states = self.sample_states()
+        for name in names or self.BENCHMARKS:
+            self.BENCHMARKS[name](self, states)
+        return {"meta": self.meta(), "results": self.results}
+
+    def meta(self):  # פרטי הסביבה, כדי לדעת אם שתי ריצות בכלל ברות השוואה
+        return {
+            "seed": self.seed,
+            "seconds": self.seconds,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "bitboard": USE_BITBOARD,
+            "learner_compile": LEARNER_COMPILE,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+
+def compare(results, baseline, tolerance=BENCHMARK_TOLERANCE):  # משווה לריצה שמורה, מחזיר את שמות הבדיקות שהואטו יותר מ tolerance
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or old["value"] == 0:
+            continue
+        change = current["value"] / old["value"] - 1
+        if not current["higher_is_better"]:
+            change = -change  # בזמן ריצה ירידה היא שיפור
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} {old['value']:>12.1f} {current['value']:>12.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the BlockBlast hot paths")
+    parser.add_argument("--only", nargs="+", choices=list(Benchmark.BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--seconds", type=float, default=BENCHMARK_SECONDS, help="measuring time per benchmark")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED)
+    parser.add_argument("--threads", type=int, default=BENCHMARK_THREADS, help="torch threads")
+    parser.add_argument("--out", default=BENCHMARK_RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE_PATH, help="results JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results as the new baseline")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    results = Benchmark(seed=args.seed, seconds=args.seconds).run(args.only)
+
+    paths = [args.out] + ([args.baseline] if args.save_baseline else [])
+    for path in paths:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            if compare(results, json.load(f)):
+                sys.exit(1)
@@ -0,0 +1,119 @@
+import numpy as np
+from CONSTANTS import BOARD_WIDTH, BOARD_HEIGHT, BLOCK_SHAPES
+from Block import UNIQUE_SHAPES
+
+# ייצוג הלוח כמספר שלם אחד של 64 ביט: ביט y*8+x מייצג את המשבצת (x, y)
+FULL_BOARD = (1 << (BOARD_WIDTH * BOARD_HEIGHT)) - 1
+ROW_MASKS = tuple(((1 << BOARD_WIDTH) - 1) << (y * BOARD_WIDTH) for y in range(BOARD_HEIGHT))
+COL_MASKS = tuple(sum(1 << (y * BOARD_WIDTH + x) for y in range(BOARD_HEIGHT)) for x in range(BOARD_WIDTH))
+LINE_MASKS = np.array(ROW_MASKS + COL_MASKS, dtype=np.uint64)  # כל השורות ואז כל העמודות
+
+_placements_cache = {}  # מטמון של כל המסכות לכל צורה לפי המפתח שלה
+_mask_tables = {}  # מטמון של מערכי המסכות (numpy) לכל צורה
+_line_sums = {}  # מטמון של כמות המשבצות בכל שורה ועמודה של כל צורה
+# id של כל רשימת צורה ב BLOCK_SHAPES -> המפתח שלה. הרשימות האלה (וגם הבלוקים, שחולקים אותן) קיימות כל זמן ריצת התוכנית
+# ואף אחד לא משנה אותן, כך שה id שלהן קבוע
+_known_keys = {id(shape): tuple(map(tuple, shape)) for shape in BLOCK_SHAPES.values()}
+
+
+def shape_key(shape):  # מפתח hashable לצורה (רשימה של רשימות)
+    key = _known_keys.get(id(shape))  # צורה מהקטלוג: בלי לבנות את ה tuple בכל קריאה
+    if key is None:
+        key = tuple(tuple(row) for row in shape)
+    return key
+
+
+def cell_bit(x, y):
+    return 1 << (y * BOARD_WIDTH + x)
+
+
+def build_placements(shape):  # מחשב מראש את המסכה ואת המשבצות עבור כל מיקום חוקי של הצורה בלוח
+    cells = [(x, y) for y, row in enumerate(shape) for x, cell in enumerate(row) if cell == 1]
+    h = len(shape)
+    w = len(shape[0]) if h > 0 else 0
+    placements = {}
+    for y in range(BOARD_HEIGHT - h + 1):
+        for x in range(BOARD_WIDTH - w + 1):
+            mask = 0
+            for dx, dy in cells:
+                mask |= cell_bit(x + dx, y + dy)
+            ys = tuple(y + dy for dx, dy in cells)
+            xs = tuple(x + dx for dx, dy in cells)
+            placements[(x, y)] = (mask, ys, xs)
+    return placements
+
+
+def placements(shape):  # מחזיר את טבלת המיקומים של הצורה, מחושבת פעם אחת בלבד
+    key = shape_key(shape)
+    table = _placements_cache.get(key)
+    if table is None:
+        table = build_placements(shape)
+        _placements_cache[key] = table
+    return table
+
+
+def placement(shape, x, y):  # (mask, ys, xs) עבור מיקום נתון, או None אם הצורה יוצאת מגבולות הלוח
+    return placements(shape).get((x, y))
+
+
+def mask_table(shape):  # מערך uint64 של כל המסכות של הצורה ורשימת המיקומים המתאימים, באותו סדר
+    key = shape_key(shape)
+    table = _mask_tables.get(key)
+    if table is None:
+        entries = placements(shape)
+        masks = np.array([mask for mask, _, _ in entries.values()], dtype=np.uint64)
+        table = (masks, tuple(entries.keys()))
+        _mask_tables[key] = table
+    return table
+
+
+def line_sums(shape):  # כמה משבצות יש לצורה בכל אחת מהשורות שלה ובכל אחת מהעמודות שלה
+    key = shape_key(shape)
+    sums = _line_sums.get(key)
+    if sums is None:
+        sums = (tuple(sum(row) for row in shape), tuple(sum(col) for col in zip(*shape)))
+        _line_sums[key] = sums
+    return sums
+
+
+def legal_indices(masks, bits):  # בדיקה וקטורית אחת של כל המסכות מול הלוח, מחזיר את האינדקסים החוקיים
+    return np.flatnonzero((masks & np.uint64(bits)) == 0)
+
+
+def lines_mask(rows, cols):  # המסכה של כל המשבצות בשורות ובעמודות הנתונות
+    cleared = 0
+    for y in rows:
+        cleared |= ROW_MASKS[y]
+    for x in cols:
+        cleared |= COL_MASKS[x]
+    return cleared
+
+
+def clear_lines_batch(boards):  # פיצוץ שורות ועמודות עבור מערך של לוחות בבת אחת
+    full = (boards[:, None] & LINE_MASKS) == LINE_MASKS  # (N, 16) - אילו קווים מלאים בכל לוח
+    cleared = np.bitwise_or.reduce(np.where(full, LINE_MASKS, np.uint64(0)), axis=1)
+    return boards & ~cleared, full.sum(axis=1), cleared
+
+
+def unpack(boards):  # ממיר מערך לוחות של 64 ביט למערך בוליאני (N, 64) לפי סדר המשבצות בלוח
+    as_bytes = boards.astype('<u8').view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(as_bytes, axis=1, bitorder='little').view(bool)
+
+
+def from_board(board):  # ממיר לוח numpy למספר של 64 ביט
+    packed = np.packbits(np.asarray(board).ravel() != 0, bitorder='little')
+    return int(packed.view('<u8')[0])
+
+
+# אינדקס שמחושב פעם אחת בעליית התוכנית: לכל צורה בקטלוג (בלי כפילויות) את מערך המסכות שלה
+SHAPE_MASKS = {name: mask_table(shape)[0] for name, shape in UNIQUE_SHAPES.items()}
+
+# כל המיקומים של כל הצורות במערך אחד, לפי סדר הצורות ואז שורה ועמודה
+ALL_MASKS = np.concatenate(list(SHAPE_MASKS.values()))
+# מערך של אובייקטים (name, shape, position), כדי לשלוף את כל המהלכים החוקיים באינדוקס אחד במקום בלולאה
+ALL_PLACEMENTS = np.fromiter(
+    ((name, shape, position)
+     for name, shape in UNIQUE_SHAPES.items()
+     for position in mask_table(shape)[1]),
+    dtype=object, count=len(ALL_MASKS),
+)
@@ -1,16 +1,56 @@
+import numpy as np
+from CONSTANTS import BLOCK_SHAPES
+
+# הקטלוג: כל צורה שונה פעם אחת. ב BLOCK_SHAPES יש כפילויות (15 נקודות, square ו small_square),
+# והן קובעות את ההתפלגות: ההגרלה נשארת על הכניסות של BLOCK_SHAPES ו ENTRY_SHAPE ממפה אותן לצורות בקטלוג
+SHAPES = []  # הצורות השונות, לפי ההופעה הראשונה שלהן ב BLOCK_SHAPES
+SHAPE_NAMES = []  # השם של ההופעה הראשונה
+SHAPE_IDS = {}  # הצורה כ tuple של tuples -> האינדקס שלה בקטלוג
+ENTRY_SHAPE = []  # לכל כניסה ב BLOCK_SHAPES, האינדקס של הצורה שלה בקטלוג
+for name, shape in BLOCK_SHAPES.items():
+    key = tuple(map(tuple, shape))
+    if key not in SHAPE_IDS:
+        SHAPE_IDS[key] = len(SHAPES)
+        SHAPES.append(shape)
+        SHAPE_NAMES.append(name)
+    ENTRY_SHAPE.append(SHAPE_IDS[key])
+ENTRY_SHAPE = np.array(ENTRY_SHAPE)
+UNIQUE_SHAPES = dict(zip(SHAPE_NAMES, SHAPES))  # שם -> צורה, כמו BLOCK_SHAPES בלי הכפילויות
+
+
 class Block:
+    __slots__ = ("shape", "shape_id", "rect", "color_id", "initial_position")
+
+    RED = (220, 70, 70)
+    YELLOW = (240, 200, 50)
+    ORANGE = (240, 130, 50)
+    GREEN = (100, 200, 100)
+    BLUE = (100, 100, 240)
+    PURPLE = (180, 100, 240)
+    COLORS = (RED, YELLOW, ORANGE, GREEN, BLUE, PURPLE)  # טבלה אחת לכל הבלוקים במקום רשימה בכל בלוק
+
     def __init__(self, shape, rect, color_id):
-        self.shape = shape  # הצורה של הבלוק
+        self.shape = shape  # הצורה של הבלוק (אותה רשימה מהקטלוג, לא עותק)
+        self.shape_id = SHAPE_IDS.get(tuple(map(tuple, shape)))  # האינדקס בקטלוג, None לצורה שלא בקטלוג
         self.rect = rect  # מיקום וגודל
         self.color_id = color_id  # צבע
-        self.initial_position = rect.copy()  # המיקום ההתחלתי של הבלוק 
-        
-        RED = (220, 70, 70)
-        YELLOW = (240, 200, 50)
-        ORANGE = (240, 130, 50)
-        GREEN = (100, 200, 100)
-        BLUE = (100, 100, 240)
-        PURPLE = (180, 100, 240)
-        colors = [RED, YELLOW, ORANGE, GREEN, BLUE, PURPLE]
-        
-        self.color = colors[color_id % len(colors)]
\ No newline at end of file
+        self.initial_position = rect.copy() if rect is not None else None  # המיקום ההתחלתי של הבלוק (None בליבה בלי מסך)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):  # מקבל גם בלוק מקובץ ישן (לפני __slots__, עם רשימת הצבעים בכל בלוק)
+        self.__init__(state["shape"], state.get("rect"), state["color_id"])
+        if state.get("initial_position") is not None:
+            self.initial_position = state["initial_position"]
+
+    @classmethod
+    def from_id(cls, shape_id, rect, color_id):  # בלוק לפי האינדקס של הצורה בקטלוג
+        return cls(SHAPES[shape_id], rect, color_id)
+
+    def __hash__(self):  # לפי הצבע (שונה בכל בלוק בתור), כך שהסדר בסט של הבלוקים לא תלוי בכתובות בזיכרון
+        return self.color_id
+
+    @property
+    def color(self):
+        return self.COLORS[self.color_id % len(self.COLORS)]
@@ -1,6 +1,10 @@
 # ==================== GRAPHICS & DISPLAY ====================
 # FPS and screen settings
 FPS = 60
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces Graphics keeps before clearing the cache
+TRAIN_RENDER = True  # Show training in a separate render process, False trains without a window
+TRAIN_RENDER_FPS = 30  # Frame cap of the training window; snapshots are sent at most this often
+TRAIN_RENDER_EVERY = 1  # Render every Nth training episode
 
 # Grid configuration (relative to screen size)
 # GRID_SIZE is calculated as width / 30
@@ -42,6 +46,10 @@ BOARD_HEIGHT = 8
 
 # Number of blocks shown at a time
 NUM_BLOCKS_PER_TURN = 3
+PIECE_BATCH_SIZE = 1024  # Triplets each Engine draws from its generator at once
+
+# Use the 64-bit bitboard engine (Bitboard.py) for legality checks, placement and line clears
+USE_BITBOARD = True
 
 # Game timing (milliseconds)
 AI_MOVE_DELAY = 750  # Delay between AI moves for visualization
@@ -69,10 +77,27 @@ GAMMA = 0.99  # Discount factor for future rewards
 NUM_EPOCHS = 20000
 REPLAY_BUFFER_CAPACITY = 100000
 MIN_BUFFER_SIZE_FOR_TRAINING = 5000  # Start training after this many experiences
+REPLAY_BUFFER_STORAGE = "tensor"  # "deque" (tuples of tensors), "tensor" (preallocated uint8 ring), "memmap" (on disk) or "prioritized"
+
+# Prioritized experience replay (REPLAY_BUFFER_STORAGE = "prioritized")
+PER_ALPHA = 0.6  # How strongly TD error shapes the sampling distribution (0 = uniform)
+PER_BETA_START = 0.4  # Initial importance-sampling correction, annealed to 1
+PER_BETA_STEPS = 100000  # Sampled batches over which beta reaches 1
+PER_EPSILON = 1e-5  # Added to |TD error| so no transition gets zero priority
+
+# How the learner step (online + target forward and loss) is run: "eager", "compile" (torch.compile)
+# or "script" (TorchScript, deprecated in recent torch and warns, opt-in only)
+LEARNER_COMPILE = "eager"
 
 # Model update frequency
 NETWORK_UPDATE_FREQUENCY = 3  # Update target network every C steps
 
+# Actor/learner training (Actor_Learner.py)
+NUM_ACTORS = 4  # Number of actor processes collecting experience
+ACTOR_SEND_EVERY = 64  # Transitions an actor batches before sending them to the learner
+ACTOR_SYNC_EVERY = 100  # Learner steps between publishing weights to the actors
+THROUGHPUT_REPORT_SECONDS = 30  # How often the learner prints throughput
+
 # Learning rate scheduler milestones
 LR_SCHEDULER_MILESTONES = [5000, 10000, 15000]  # Epochs to reduce learning rate
 LR_SCHEDULER_GAMMA = 0.5  # Multiply learning rate by this value
@@ -83,6 +108,54 @@ DATA_DIRECTORY = "Data/"
 MODEL_PATH_TEMPLATE = f"{DATA_DIRECTORY}Model{{}}.ptn"  # Use with .format(model_number)
 BUFFER_PATH_TEMPLATE = f"{DATA_DIRECTORY}Train{{}}.ptn"  # Use with .format(model_number)
 DEFAULT_MODEL_NUMBER = 26
+MEMMAP_BUFFER_DIRECTORY = f"{DATA_DIRECTORY}Buffer/"  # Files of the memory-mapped replay buffer
+BENCHMARK_RESULTS_PATH = f"{DATA_DIRECTORY}benchmark.json"  # Output of Benchmark.py
+BENCHMARK_BASELINE_PATH = f"{DATA_DIRECTORY}benchmark_baseline.json"  # Saved run that Benchmark.py compares against
+GAME_STATS_DB_PATH = "game_stats.db"  # Results of finished games (human, AI play and training)
+METRICS_DIRECTORY = f"{DATA_DIRECTORY}Metrics/"  # Local training metrics (CSV / SQLite / Parquet)
+PROFILE_CSV_PATH = f"{DATA_DIRECTORY}profile.csv"  # Stage timings when PROFILE_OUTPUTS includes "csv"
+PROFILER_OUTPUT_PATH = f"{DATA_DIRECTORY}profile"  # .prof (cProfile) or .json (torch.profiler trace) is appended
+
+# ==================== BENCHMARK SETTINGS ====================
+BENCHMARK_SEED = 0
+BENCHMARK_SECONDS = 2.0  # Measuring time per benchmark
+BENCHMARK_THREADS = 1  # torch threads, fixed so runs on the same machine are comparable
+BENCHMARK_STATES = 64  # Mid-game states the move/after-state benchmarks cycle through
+BENCHMARK_BUFFER_SIZES = (1000, 10000, 100000)  # Replay buffer sizes for the sample latency benchmark
+BENCHMARK_BUFFER_STORAGES = ("deque", "tensor", "memmap", "prioritized")
+BENCHMARK_TOLERANCE = 0.10  # Slowdown vs the baseline that counts as a regression
+
+# ==================== PROFILING SETTINGS ====================
+PROFILE_STAGES = False  # Time every stage of the training step (render, moves, after-states, sample, backprop...)
+PROFILE_REPORT_EVERY = 1000  # Environment steps per report
+PROFILE_OUTPUTS = ("stdout",)  # Any of "stdout", "csv", "metrics" (the training metrics logger)
+PROFILER = None  # None, "cprofile" or "torch" to profile a window of the training loop
+PROFILER_START_STEP = 6000  # First profiled step (after the buffer warm-up, so learning steps are included)
+PROFILER_STEPS = 500  # Length of the profiled window
+
+# ==================== EVALUATION SETTINGS ====================
+EVAL_GAMES = 1000  # Greedy games per checkpoint in Evaluate.py
+EVAL_WORKERS = 4  # Evaluation processes
+EVAL_ENVS_PER_WORKER = 64  # Games each process plays side by side in a VecBlockBlastEnv
+EVAL_SEED = 0
+EVAL_SEARCH_GAMES = 40  # Games per checkpoint with --mode search (a search move is ~100x slower than a greedy one)
+EVAL_SEARCH_MAX_MOVES = 1000  # A search game is ended after this many moves; with a trained model games run into the thousands
+
+# ==================== SEARCH AGENT SETTINGS ====================
+SEARCH_BEAM_WIDTH = 32  # Sequences kept at each depth of the search over the current pieces
+SEARCH_TIME_BUDGET = 0.05  # Seconds per search; the first depth (greedy) is always finished
+SEARCH_TABLE_SIZE = 0  # Board values the search agent keeps between searches (LRU), 0 = off: measured hit rate was ~0.01%
+
+# ==================== Q CACHE SETTINGS ====================
+Q_CACHE_SIZE = 0  # Board values AgentCore keeps between moves (LRU), 0 = off: greedy after-states almost never repeat
+
+# ==================== GAME STATS SETTINGS ====================
+GAME_STATS_BATCH_SIZE = 256  # Finished games collected before one insert transaction
+
+# ==================== METRICS SETTINGS ====================
+METRICS_BACKENDS = ("sqlite",)  # Any of "csv", "sqlite", "parquet" (needs pyarrow), "wandb" (needs wandb and network)
+METRICS_FLUSH_SECONDS = 2.0  # The background writer flushes at least this often
+METRICS_BATCH_SIZE = 1000  # ...or as soon as this many records are queued
 
 # ==================== WANDB SETTINGS ====================
 # Weights & Biases logging configuration
@@ -0,0 +1,422 @@
+import numpy as np
+from types import SimpleNamespace
+from Block import Block, SHAPES, ENTRY_SHAPE, UNIQUE_SHAPES
+from State2 import State
+import Bitboard
+import torch
+from CONSTANTS import *
+
+class Engine:  # ליבת המשחק בקואורדינטות גריד בלבד, בלי pygame - מתאימה לאימון על שרתים בלי מסך
+    
+    REWARD_EXPLODE = REWARD_EXPLODE
+    REWARD_SQUARES_PER_BLOCK = REWARD_SQUARES_PER_BLOCK
+    REWARD_SQUARES_IN_SAME_ROW_OR_COL = REWARD_SQUARES_IN_SAME_ROW_OR_COL
+    
+    def __init__(self, state, bitboard=USE_BITBOARD, log=print, seed=None):
+        
+        self.state = state
+        self.bitboard = bitboard  # האם להשתמש בלוח ביטים (Bitboard) לבדיקות חוקיות, הנחה ופיצוץ שורות
+        self.log = log  # פונקציה שמקבלת הודעות של הסביבה (למשל סוף משחק), None כדי לא לרשום כלום
+        self.num_explosions = 0
+        self.last_move_valid = False
+        self.seed(seed)
+
+    def seed(self, seed=None): # מחולל PCG64 משלו לכל סביבה. seed הוא מספר, SeedSequence (מ spawn) או None לזרע אקראי
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.rng = np.random.Generator(np.random.PCG64(seed))
+        self.triplets = []  # שלישיות של אינדקסים בקטלוג שכבר הוגרלו ועוד לא חולקו
+        self.next_triplet = 0
+
+    def spawn(self, n): # n זרמים בלתי תלויים (למשל לתהליכים), כל אחד מתאים ל Engine(..., seed=...)
+        return self.seed_sequence.spawn(n)
+
+    def draw_triplet(self): # שלוש צורות מהקטלוג, מוגרלות מראש בבאצ'ים של PIECE_BATCH_SIZE
+        if self.next_triplet >= len(self.triplets):
+            # שלוש כניסות שונות של BLOCK_SHAPES (עם הכפילויות, כך שההתפלגות לא משתנה) ממופות לצורות בקטלוג
+            keys = self.rng.random((PIECE_BATCH_SIZE, len(ENTRY_SHAPE)))
+            self.triplets = ENTRY_SHAPE[np.argsort(keys, axis=1)[:, :NUM_BLOCKS_PER_TURN]].tolist()
+            self.next_triplet = 0
+        triplet = self.triplets[self.next_triplet]
+        self.next_triplet += 1
+        return triplet
+
+    def all_shapes(self):
+        return UNIQUE_SHAPES  # מחזיר את כל הצורות הקיימות, כל צורה פעם אחת
+
+    def reset(self):
+        self.state = State()      # אתחול מצב חדש
+        self.set_random_block()   # יצירת שלוש בלוקים אקראיות
+
+    def shutdown(self):
+        pass  # אין משאבים לשחרר בליבה
+
+    def set_random_block(self, state: State = None):
+        if state is None:
+            state = self.state
+        blocks_lst = [self.make_block(SHAPES[shape_id], i) for i, shape_id in enumerate(self.draw_triplet())]
+
+        state.Blocks = set(blocks_lst)  # הבלוקים נשמרים במבנה סט בשביל למנוע כפילויות
+
+    def make_block(self, shape, index): # יוצר את הבלוק ה-index מתוך השלושה, בלי מיקום על המסך
+        return Block(shape, None, index + 1)
+
+    def reset_block_position(self, block): # נקרא אחרי מהלך לא חוקי, לליבה אין מיקום על המסך להחזיר
+        pass
+
+    def move(self, state: State, action: tuple): # action = (block, (grid_x, grid_y))
+        block, (grid_x, grid_y) = action
+
+        filled_count = 0  # כמות המשבצות שמולאו במהלך בשביל חישוב התגמול
+        if self.is_valid_move(state, block, (grid_x, grid_y)):
+            filled_count = self.sum_ones_in_affected_rows_cols(state, block, (grid_x, grid_y))
+            bits_before = state.bits
+            self.fix_block_to_board(state, block, (grid_x, grid_y))
+            bits_placed = state.bits
+
+            num_expl = self.check_and_explode_rows(state)  # בודק ומנקה שורות/עמודות מלאות
+            self.num_explosions = num_expl
+            state.moves += 1  # סטטיסטיקה של המשחק
+            state.lines_cleared += num_expl
+            state.max_combo = max(state.max_combo, state.combo_count)
+            if self.bitboard:
+                # מעדכן רק את המיקומים שהמהלך והפיצוץ נגעו בהם
+                self.update_legal_cache(state, block, bits_placed & ~bits_before, bits_placed & ~state.bits)
+            self.last_move_valid = True
+        else:
+            # החזרת הבלוק למיקומו המקורי במקרה שמתקבל מהלך לא חוקי
+            self.reset_block_position(block)
+            self.last_move_valid = False
+            self.num_explosions = 0
+
+        self.check_and_generate_blocks()  # אם אין בלוקים - צור חדשים
+        return filled_count  # מחזיר כמה תאים מולאו על ידי המהלך
+
+    def Get_Reward_Args(self, state: State, action: tuple): # action = (block, (grid_x, grid_y))
+        # אם המהלך האחרון לא היה חוקי התגמול יהיה 0
+        if not self.last_move_valid:
+            return 0
+
+        block, (grid_x, grid_y) = action
+
+        reward = self.Get_Reward(state, block, grid_x, grid_y)
+        return reward
+
+    def Get_Reward(self, state, block, grid_x, grid_y):
+        reward = self.count_squares_of_block(block.shape) * self.REWARD_SQUARES_PER_BLOCK # כמות המשבצות של הבלוק
+        reward += self.sum_ones_in_affected_rows_cols(state, block, (grid_x, grid_y)) * self.REWARD_SQUARES_IN_SAME_ROW_OR_COL # כמות המשבצות באותן שורות ועמודות
+        reward += self.num_explosions * self.REWARD_EXPLODE # כמות הפיצוצים
+        return reward
+
+    def count_squares_of_block(self, shape):
+        return sum(Bitboard.line_sums(shape)[0])  # סוכם את מספר המשבצות של הבלוק (הסכום של כל שורה נשמר לכל צורה)
+
+    def count_ones_per_row_col(self, state: State): # מחזיר את כמות המשבצות המלאות בכל השורות ובכל העמודות
+        return state.row_counts, state.col_counts  # המונים של המצב, מתעדכנים בכל הנחה ופיצוץ
+
+    def sum_ones_in_affected_rows_cols(self, state: State, block: Block, position: tuple) -> int: # מחזיר את כמות המשבצות המלאות באותם שורות ועמודות בהן מונח הבלוק
+        shape = getattr(block, 'shape', [])
+        h = len(shape)
+        w = len(shape[0]) if h > 0 else 0
+        grid_x, grid_y = position
+
+        board = state.Board
+        min_y = max(0, grid_y)
+        min_x = max(0, grid_x)
+        max_y = min(board.shape[0], grid_y + h)
+        max_x = min(board.shape[1], grid_x + w)
+
+        if min_y >= max_y or min_x >= max_x:
+            return 0
+
+        row_counts, col_counts = self.count_ones_per_row_col(state) # כמות המשבצות המלאות בכל שורה ועמודה לפני שמניחים את הבלוק
+
+        # סכום המשבצות המלאות באותן שורות ועמודות בהן מונח הבלוק
+        total_rows = sum(row_counts[min_y:max_y])
+        total_cols = sum(col_counts[min_x:max_x])
+
+        total = int(total_rows + total_cols) - self.count_squares_of_block(block.shape) * 2 # מפחיתים את המשבצות של הבלוק עצמו פעמיים כי הן נספרות בשורות וגם בעמודות
+        return total
+
+    def is_valid_move(self, state: State, block: Block, position: tuple) -> bool:  # בודק האם המהלך חוקי
+        board = state.Board
+        grid_x, grid_y = position
+
+        shape = getattr(block, 'shape', None)
+        if shape is None:
+            return False
+
+        if self.bitboard:
+            # מסכה מחושבת מראש עבור המיקום, None אם הבלוק יוצא מגבולות הלוח
+            entry = Bitboard.placement(shape, grid_x, grid_y)
+            return entry is not None and (state.bits & entry[0]) == 0
+
+        shape_arr = np.array(shape)
+        h, w = shape_arr.shape
+
+        # בדיקת גבולות - בודק אם הבלוק נכנס ללוח
+        if grid_x < 0 or grid_y < 0 or (grid_x + w) > board.shape[1] or (grid_y + h) > board.shape[0]:
+            return False
+
+        # בודק שהבלוק מונח על משבצות ריקות
+        board_slice = board[grid_y:grid_y + h, grid_x:grid_x + w]
+        if np.any(board_slice * shape_arr != 0):
+            return False
+
+        return True
+
+    def fix_block_to_board(self, state: State, block: Block, position: tuple): # מקבע את הבלוק ללוח
+        board = state.Board
+        grid_x, grid_y = position
+        placed_cells = 0
+
+        entry = Bitboard.placement(block.shape, grid_x, grid_y) if self.bitboard else None
+        if entry is not None:
+            mask, ys, xs = entry
+            board[ys, xs] = block.color_id  # מניח את כל משבצות הבלוק בפעולה אחת
+            state.bits |= mask
+            placed_cells = len(ys)
+            row_sums, col_sums = Bitboard.line_sums(block.shape)
+            for i, n in enumerate(row_sums):
+                state.row_counts[grid_y + i] += n
+            for i, n in enumerate(col_sums):
+                state.col_counts[grid_x + i] += n
+        else:
+            placed_cells = self._fix_cells_to_board(state, block, position)
+
+        state.score += placed_cells  # נותן נקודה על כל משבצת שהונחה
+
+        # הסרת הבלוק מרשימת הבלוקים הזמינים אם הוא הונח
+        if block in state.Blocks:
+            state.Blocks.remove(block)
+
+    def _fix_cells_to_board(self, state: State, block: Block, position: tuple): # מניח את משבצות הבלוק אחת אחת ומחזיר כמה הונחו
+        board = state.Board
+        grid_x, grid_y = position
+        placed_cells = 0
+
+        # הלולאה שמניחה את הבלוק על הלוח ומעדכנת את מצב הלוח
+        for y, row in enumerate(block.shape):
+            for x, cell in enumerate(row):
+                if cell == 1:
+                    board_x = grid_x + x
+                    board_y = grid_y + y
+                    # בודק שהבלוק בתוך גבולות הלוח
+                    if 0 <= board_x < len(board[0]) and 0 <= board_y < len(board):
+                        board[board_y][board_x] = block.color_id
+                        state.row_counts[board_y] += 1
+                        state.col_counts[board_x] += 1
+                        placed_cells += 1
+                        if self.bitboard:
+                            state.bits |= Bitboard.cell_bit(board_x, board_y)
+        return placed_cells
+
+    def check_and_generate_blocks(self): # בודק אם אין בלוקים זמינים ומייצר חדשים אם צריך 
+        if not self.state.Blocks:
+            self.set_random_block()
+
+    def check_and_explode_rows(self, state: State): # בודק אם יש שורות או עמודות מלאות, מפוצץ אותן ומחזיר כמה פיצוצים היו
+        board = state.Board
+        # שורות ועמודות מלאות לפי המונים, בלי לעבור על הלוח
+        rows_to_explode = [y for y, n in enumerate(state.row_counts) if n == BOARD_WIDTH]
+        cols_to_explode = [x for x, n in enumerate(state.col_counts) if n == BOARD_HEIGHT]
+
+        # ניקוי השורות והעמודות שנמצאו
+        if rows_to_explode or cols_to_explode:
+            board[rows_to_explode, :] = 0
+            board[:, cols_to_explode] = 0
+            if self.bitboard:
+                state.bits &= ~Bitboard.lines_mask(rows_to_explode, cols_to_explode)  # פעולת AND אחת על הביטים
+
+        num_explosions = len(rows_to_explode) + len(cols_to_explode)
+        if num_explosions > 0:
+            # כל עמודה שהתפוצצה הייתה מלאה, ולכן הורידה משבצת אחת מכל שורה (ולהפך)
+            rows, cols = set(rows_to_explode), set(cols_to_explode)
+            state.row_counts = [0 if y in rows else n - len(cols) for y, n in enumerate(state.row_counts)]
+            state.col_counts = [0 if x in cols else n - len(rows) for x, n in enumerate(state.col_counts)]
+        # קומבו
+        if num_explosions > 0:
+            state.turns_since_last_explosion = 0
+            if state.in_combo:
+                state.combo_count += num_explosions
+            else:
+                state.combo_count = num_explosions
+
+            for i in range(num_explosions):
+                state.score += (state.combo_count + i) * 10
+
+            state.in_combo = True
+        else:
+            state.turns_since_last_explosion += 1
+            # אם עברו כמה תורות בלי פיצוץ — מאפסים קומבו
+            if state.turns_since_last_explosion > 2:
+                state.in_combo = False
+                state.combo_count = 0
+        return num_explosions
+
+    def legal_cache(self, state: State): # מחזיר לכל בלוק מערך בוליאני של המיקומים החוקיים שלו, מחשב מחדש רק אם המטמון לא תקף
+        if state.legal_moves is None or state.legal_bits != state.bits or state.legal_moves.keys() != state.Blocks:
+            occupancy = np.uint64(state.bits)
+            state.legal_moves = {}
+            by_shape = {}  # שני בלוקים עם אותה צורה (למשל שתי נקודות) נבדקים פעם אחת
+            for block in state.Blocks:
+                legal = by_shape.get(id(block.shape))
+                if legal is None:
+                    masks = Bitboard.mask_table(block.shape)[0]
+                    legal = by_shape[id(block.shape)] = (masks & occupancy) == 0
+                    state.legal_moves[block] = legal
+                else:
+                    state.legal_moves[block] = legal.copy()  # המערכים מתעדכנים במקום, לכל בלוק מערך משלו
+            state.legal_bits = state.bits
+            state.playable_blocks = sum(1 for legal in state.legal_moves.values() if legal.any())
+        return state.legal_moves
+
+    def update_legal_cache(self, state: State, placed_block, placed, cleared): # עדכון המטמון אחרי הנחה ופיצוץ
+        # placed - המשבצות שהבלוק מילא, cleared - המשבצות שהתרוקנו בפיצוץ
+        cache = state.legal_moves
+        bits_before = (state.bits | cleared) & ~placed
+        if cache is None or state.legal_bits != bits_before:
+            state.legal_moves = None  # המטמון לא מתאים ללוח שלפני המהלך, יחושב מחדש בפעם הבאה
+            return
+        cache.pop(placed_block, None)
+        occupancy = np.uint64(state.bits)
+        playable = 0
+        for block, legal in cache.items():
+            masks = Bitboard.mask_table(block.shape)[0]
+            legal &= (masks & np.uint64(placed)) == 0  # מיקומים שהבלוק החדש חוסם
+            if cleared:
+                reopened = (masks & np.uint64(cleared)) != 0  # מיקומים שהפיצוץ אולי פתח מחדש
+                legal[reopened] = (masks[reopened] & occupancy) == 0
+            if legal.any():
+                playable += 1
+        state.legal_bits = state.bits
+        state.playable_blocks = playable
+
+    def is_game_over(self, state: State) -> bool: # בודק אם יש מהלך חוקי אחד לפחות, אם לא, המשחק נגמר
+        board = state.Board
+        if self.bitboard:
+            self.legal_cache(state)
+            if state.playable_blocks > 0:
+                return False
+            self._log(f"Game Over! Score: {state.score}")
+            return True
+
+        for block in state.Blocks:
+            for y in range(len(board)):
+                for x in range(len(board[0])):
+                    # אם נמצא מהלך חוקי אחד, המשחק לא נגמר
+                    if self.is_valid_move(state, block, (x, y)):
+                        return False
+        self._log(f"Game Over! Score: {state.score}")
+        return True
+
+    def _log(self, message):
+        if self.log is not None:
+            self.log(message)
+
+    def GetAllPossibleMoves(self, state: State): # מחזיר את כל המהלכים החוקיים עבור המצב הנוכחי לכל הבלוקים במ
+        board = state.Board
+        shapes = self.all_shapes()
+        legal_moves = []
+
+        if self.bitboard:
+            # בדיקה וקטורית אחת של כל המסכות, הסדר זהה לסדר של הלולאה הרגילה
+            legal = Bitboard.legal_indices(Bitboard.ALL_MASKS, state.bits)
+            return tuple(Bitboard.ALL_PLACEMENTS[legal].tolist())
+
+        for name, shape in shapes.items(): # בודק חוקיות מהלך של כל בלוק בכל מקום אפשרי בלוח
+            shape_h = len(shape)
+            shape_w = len(shape[0]) if shape_h > 0 else 0
+
+            max_y = board.shape[0] - shape_h
+            max_x = board.shape[1] - shape_w
+            if max_y < 0 or max_x < 0:
+                continue
+
+            for y in range(0, max_y + 1):
+                for x in range(0, max_x + 1):
+                    # משתמש ב-dummy object בשביל לבדוק חוקיות מיקום עבור צורה נתונה
+                    dummy = SimpleNamespace(shape=shape)
+                    if self.is_valid_move(state, dummy, (x, y)):
+                        legal_moves.append((name, shape, (x, y)))
+
+        return tuple(legal_moves)
+
+    def AfterState(self, state: State, moves): # מחזיר את כל המצבים שנוצרים לאחר ביצוע כל המהלכים החוקיים
+        resulting_states = []
+        for mv in moves:
+            try:
+                name, shape, pos = mv
+            except Exception:
+                continue
+            x, y = pos
+
+            new_state = state.copy(legal=False)  # המטמון של המהלכים החוקיים לא תקף אחרי המהלך, לא מעתיקים אותו
+
+            dummy_block = Block(shape, None, 1)
+
+            self.fix_block_to_board(new_state, dummy_block, (x, y))
+
+            self.check_and_explode_rows(new_state)
+
+            if not new_state.Blocks:
+                self.set_random_block(new_state)
+
+            # מוסיף את המצב שנוצר בעקבות המהלך לרשימת המצבים
+            resulting_states.append(new_state)
+
+        return resulting_states
+
+    def occupancy(self, state: State): # מחזיר את הלוח כמספר של 64 ביט
+        if self.bitboard:
+            return state.bits
+        return Bitboard.from_board(state.Board)
+
+    def BatchAfterStates(self, state: State, moves): # כל המצבים שאחרי המהלכים בטנסור אחד (N,1,8,8) בלי להעתיק אובייקטים
+        # מקבל מהלכים בפורמט (name, shape, pos) או (block, pos)
+        n = len(moves)
+        masks = []
+        colors = []
+        tables = {}  # טבלת המיקומים של כל צורה נשלפת פעם אחת בלבד
+        for mv in moves:
+            if len(mv) == 3:
+                _, shape, pos = mv
+                color_id = 1
+            else:
+                block, pos = mv
+                shape, color_id = block.shape, block.color_id
+            table = tables.get(id(shape))
+            if table is None:
+                table = tables[id(shape)] = Bitboard.placements(shape)
+            masks.append(table[pos][0])
+            colors.append(color_id)
+        masks = np.array(masks, dtype=np.uint64)
+        colors = np.array(colors, dtype=np.float32).reshape(n, 1)
+
+        # הנחת כל הבלוקים ופיצוץ השורות נעשים על כל הלוחות בבת אחת
+        after_bits, explosions, cleared = Bitboard.clear_lines_batch(masks | np.uint64(self.occupancy(state)))
+
+        after_tensors = torch.empty((n, 1, 8, 8), dtype=torch.float32)  # באפר אחד לכל המצבים
+        boards = after_tensors.numpy().reshape(n, 64)
+        boards[:] = state.Board.reshape(1, 64)
+        np.copyto(boards, colors, where=Bitboard.unpack(masks))
+        boards[Bitboard.unpack(cleared)] = 0
+
+        info = SimpleNamespace(
+            moves=moves,
+            bits=after_bits,  # הלוח שאחרי כל מהלך כמספר של 64 ביט
+            explosions=explosions,  # כמה שורות ועמודות התפוצצו בכל מהלך
+            cleared=cleared,  # המשבצות שנוקו בכל מהלך
+        )
+        return after_tensors, info
+
+    def tensor_shape(self, shape): # Tensorל PyTorchהמרה מ
+        shape_T = torch.tensor(shape, dtype=torch.float32)
+        return shape_T
+
+    def GetAllAfterStates(self, state): # מחזיר את כל המצבים האפשריים אחרי כל המהלכים החוקיים
+        all_moves = self.GetAllPossibleMoves(state)
+        all_after_states = self.AfterState(state, all_moves)
+        return tuple(all_after_states)
+        
\ No newline at end of file
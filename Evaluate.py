@@ -0,0 +1,159 @@
+import argparse
+import json
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from State2 import State
+from Engine import Engine
+from Agent_Core import AgentCore, load_weights
+from Search_Agent import SearchAgent
+from VecEnv import VecBlockBlastEnv
+from CONSTANTS import *
+
+
+def evaluate_vec(path, games, seed, num_envs=EVAL_ENVS_PER_WORKER):  # משחקים חמדניים במקביל ב VecEnv, מעבר אחד ברשת לכל הלוחות
+    model = load_weights(path)
+    vec = VecBlockBlastEnv(min(num_envs, games), seed=seed)
+    # משחק נספר כשהוא מתחיל ולא כשהוא נגמר, אחרת משחקים קצרים היו נספרים יותר
+    counted = np.ones(vec.num_envs, dtype=bool)  # האם המשחק הנוכחי בכל תא נספר
+    started = vec.num_envs
+    scores, lengths = [], []
+    while vec.num_envs > 0:
+        after_tensors, _ = vec.after_states()
+        with torch.no_grad():
+            q_values = model(after_tensors)
+        _, dones, info = vec.step(vec.select_actions(q_values.numpy()))
+        for env, score, moves in zip(np.flatnonzero(dones), info["final_scores"], info["final_moves"]):
+            if not counted[env]:
+                continue
+            scores.append(int(score))
+            lengths.append(int(moves))
+            if started < games:
+                started += 1
+            else:
+                counted[env] = False
+        if not counted.all():  # ממשיכים רק עם המשחקים שעוד נספרים
+            vec.keep(np.flatnonzero(counted))
+            counted = counted[counted]
+    return scores, lengths, None
+
+
+def evaluate_agent(path, games, seed, agent_class=AgentCore, max_moves=None):  # כל משחק בנפרד עם AgentCore, אותו קוד שהסוכן משתמש בו ב Main2
+    player = agent_class(train=False, env=Engine(State(), log=None))
+    player.load_model(path)
+    env = Engine(State(), log=None)
+    scores, lengths = [], []
+    for game in range(games):
+        env.seed(seed + game)  # כל משחק עם זרע משלו, כך שהתוצאה לא תלויה בחלוקה לתהליכים
+        env.reset()
+        while not env.is_game_over(env.state):
+            if max_moves is not None and env.state.moves >= max_moves:  # המשחק נעצר, הניקוד עד עכשיו נספר
+                break
+            env.move(env.state, player.get_action(env.state))
+        scores.append(env.state.score)
+        lengths.append(env.state.moves)
+    return scores, lengths, player.q_cache.stats() if player.q_cache is not None else None
+
+
+def worker(args):
+    path, mode, games, seed, max_moves = args
+    torch.set_num_threads(1)  # תהליך לכל ליבה, בלי תחרות בין תהליכונים של torch
+    if mode == "vec":
+        return evaluate_vec(path, games, seed)
+    if mode == "search":
+        return evaluate_agent(path, games, seed, agent_class=SearchAgent, max_moves=max_moves)
+    return evaluate_agent(path, games, seed, max_moves=max_moves)
+
+
+def summarize(scores, lengths, seconds):
+    scores = np.array(scores)
+    lengths = np.array(lengths)
+    p5, p25, p75, p95 = np.percentile(scores, [5, 25, 75, 95])
+    return {
+        "games": len(scores),
+        "mean": float(scores.mean()),
+        "std": float(scores.std()),
+        "median": float(np.median(scores)),
+        "p5": float(p5), "p25": float(p25), "p75": float(p75), "p95": float(p95),
+        "min": int(scores.min()),
+        "max": int(scores.max()),
+        "mean_length": float(lengths.mean()),
+        "median_length": float(np.median(lengths)),
+        "seconds": seconds,
+        "games_per_sec": len(scores) / seconds,
+        "moves_per_sec": float(lengths.sum()) / seconds,
+    }
+
+
+def evaluate(path, games=EVAL_GAMES, workers=EVAL_WORKERS, mode="vec", seed=EVAL_SEED, pool=None, max_moves=None):
+    # max_moves: עוצר כל משחק של agent או search אחרי כמה מהלכים (ב vec אין הגבלה)
+    # מחלק את המשחקים בין התהליכים, כל תהליך עם זרע משלו
+    shares = [games // workers + (i < games % workers) for i in range(workers)]
+    offsets = np.cumsum([0] + shares[:-1])
+    jobs = [(path, mode, share, seed + int(offset), max_moves) for share, offset in zip(shares, offsets) if share > 0]
+    start = time.perf_counter()
+    results = pool.map(worker, jobs) if pool is not None else [worker(job) for job in jobs]
+    seconds = time.perf_counter() - start
+    scores = [score for part, _, _ in results for score in part]
+    lengths = [length for _, part, _ in results for length in part]
+    result = summarize(scores, lengths, seconds)
+    if max_moves is not None and mode != "vec":
+        result["capped"] = sum(length >= max_moves for length in lengths)  # משחקים שנעצרו ב max_moves ולא נגמרו
+    caches = [cache for _, _, cache in results if cache is not None]
+    if caches:  # כמה מהלוחות שהסוכנים העריכו נלקחו מהמטמון במקום לעבור ברשת
+        hits = sum(cache["hits"] for cache in caches)
+        lookups = hits + sum(cache["misses"] for cache in caches)
+        result["q_cache_hit_rate"] = hits / lookups if lookups else 0.0
+        result["q_cache_duplicates"] = sum(cache["duplicates"] for cache in caches)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless greedy evaluation of saved checkpoints")
+    parser.add_argument("checkpoints", nargs="*", default=[MODEL_PATH_TEMPLATE.format(DEFAULT_MODEL_NUMBER)])
+    parser.add_argument("--games", type=int,
+                        help=f"games per checkpoint (default {EVAL_GAMES}, {EVAL_SEARCH_GAMES} with --mode search)")
+    parser.add_argument("--workers", type=int, default=EVAL_WORKERS)
+    parser.add_argument("--mode", choices=["vec", "agent", "search"], default="vec",
+                        help="vec: batched VecBlockBlastEnv, agent: one game at a time through AgentCore, "
+                             "search: one game at a time through SearchAgent. Search plays roughly 50 moves/s "
+                             "per worker and a trained model's games run into the thousands of moves, so with "
+                             f"the defaults ({EVAL_SEARCH_GAMES} games, {EVAL_SEARCH_MAX_MOVES} moves each) "
+                             f"expect a few minutes on {EVAL_WORKERS} workers")
+    parser.add_argument("--max-moves", type=int,
+                        help=f"end each agent/search game after this many moves (default {EVAL_SEARCH_MAX_MOVES} "
+                             "with --mode search, no limit otherwise)")
+    parser.add_argument("--seed", type=int, default=EVAL_SEED)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    if args.games is None:
+        args.games = EVAL_SEARCH_GAMES if args.mode == "search" else EVAL_GAMES
+    if args.max_moves is None and args.mode == "search":
+        args.max_moves = EVAL_SEARCH_MAX_MOVES
+
+    report = {}
+    with mp.get_context("spawn").Pool(args.workers) as pool:
+        for path in args.checkpoints:
+            try:
+                load_weights(path)  # בודק שהקובץ מתאים לרשת לפני שמפעילים את כל התהליכים
+            except Exception as e:
+                print(f"{path}: cannot load ({e})")
+                continue
+            result = evaluate(path, args.games, args.workers, args.mode, args.seed, pool, args.max_moves)
+            report[path] = result
+            print(f"\n{path}  ({result['games']} games, {result['seconds']:.1f}s, "
+                  f"{result['games_per_sec']:.1f} games/s, {result['moves_per_sec']:.0f} moves/s)")
+            print(f"  score  mean {result['mean']:.1f} ± {result['std']:.1f}  median {result['median']:.0f}  "
+                  f"p5 {result['p5']:.0f}  p25 {result['p25']:.0f}  p75 {result['p75']:.0f}  p95 {result['p95']:.0f}  "
+                  f"max {result['max']}")
+            print(f"  length mean {result['mean_length']:.1f}  median {result['median_length']:.0f}"
+                  + (f"  capped at {args.max_moves} moves: {result['capped']}" if "capped" in result else ""))
+            if "q_cache_hit_rate" in result:
+                print(f"  q cache hit rate {result['q_cache_hit_rate']:.1%}  "
+                      f"duplicate boards {result['q_cache_duplicates']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"games": args.games, "mode": args.mode, "seed": args.seed, "max_moves": args.max_moves,
+                       "results": report}, f, indent=2)
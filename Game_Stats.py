@@ -0,0 +1,79 @@
+import atexit
+import sqlite3
+import time
+from CONSTANTS import *
+
+# העמודות שנוספו לטבלה המקורית (id, score, lines_cleared, date), נוספות לקובץ קיים בפתיחה הראשונה
+NEW_COLUMNS = {
+    "moves": "INTEGER",
+    "max_combo": "INTEGER",
+    "model_number": "INTEGER",  # NULL במשחק של שחקן אנושי
+    "duration": "REAL",  # שניות
+}
+
+
+class GameStats:  # תוצאות של משחקים שנגמרו ב game_stats.db, נכתבות בבאצ'ים כדי לא להאט את לולאת האימון
+    def __init__(self, path=GAME_STATS_DB_PATH, batch_size=GAME_STATS_BATCH_SIZE):
+        self.batch_size = batch_size  # כמה משחקים לאסוף לפני כתיבה אחת לדיסק
+        self.pending = []
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # קריאות (לוח תוצאות) לא חוסמות את הכתיבה
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # ב WAL זה בטוח לקריסה של התוכנית, וחוסך fsync בכל commit
+        self.create_schema()
+        atexit.register(self.close)
+
+    def create_schema(self):
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS game_stats (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    score INTEGER,
+                    lines_cleared INTEGER,
+                    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )""")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(game_stats)")}
+        for name, kind in NEW_COLUMNS.items():
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE game_stats ADD COLUMN {name} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS game_stats_score ON game_stats (score DESC)")  # לוח תוצאות
+        self.conn.execute("CREATE INDEX IF NOT EXISTS game_stats_model_score ON game_stats (model_number, score DESC)")  # לפי מודל
+        self.conn.commit()
+
+    def record(self, state, duration, model_number=None):  # שומר משחק שנגמר לפי המצב הסופי שלו
+        self.add(state.score, state.lines_cleared, state.moves, state.max_combo, duration, model_number)
+
+    def add(self, score, lines_cleared, moves, max_combo, duration, model_number=None):
+        self.pending.append((score, lines_cleared, moves, max_combo, model_number, duration,
+                             time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())))  # הזמן של סוף המשחק ולא של הכתיבה
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):  # כל המשחקים שנאספו בטרנזקציה אחת
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO game_stats (score, lines_cleared, moves, max_combo, model_number, duration, date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", self.pending)
+        self.pending.clear()
+
+    def leaderboard(self, limit=10, model_number=None):  # המשחקים עם הניקוד הגבוה ביותר, של כולם או של מודל אחד
+        self.flush()
+        if model_number is None:
+            return self.conn.execute(
+                "SELECT score, lines_cleared, moves, max_combo, model_number, duration, date FROM game_stats "
+                "ORDER BY score DESC LIMIT ?", (limit,)).fetchall()
+        return self.conn.execute(
+            "SELECT score, lines_cleared, moves, max_combo, model_number, duration, date FROM game_stats "
+            "WHERE model_number = ? ORDER BY score DESC LIMIT ?", (model_number, limit)).fetchall()
+
+    def model_summary(self):  # לכל מודל: כמות משחקים, ניקוד ממוצע, ניקוד מקסימלי ומספר מהלכים ממוצע
+        self.flush()
+        return self.conn.execute(
+            "SELECT model_number, COUNT(*), AVG(score), MAX(score), AVG(moves) FROM game_stats "
+            "GROUP BY model_number ORDER BY model_number").fetchall()
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.close()
+        self.conn = None
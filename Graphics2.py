@@ -1,17 +1,13 @@
 import pygame
 import random
+import Bitboard
+from Layout import Layout
 from CONSTANTS import *
 
 class Graphics:
     def __init__(self):
-        pygame.init()
-        info = pygame.display.get_desktop_sizes()[0]
-        self.width, self.height = info
-
-        self.GRID_ORIGIN_Y = self.height / 10
-        self.GRID_SIZE = self.width / 30
-        self.GRID_ORIGIN_X = (self.width / 2) - (self.GRID_SIZE * 4)
-        self.GRID_MARGIN = GRID_MARGIN
+        self.layout = Layout()
+        self.layout.apply(self)
 
         self.clock = pygame.time.Clock()
         self.clock.tick(FPS)
@@ -22,62 +18,135 @@ class Graphics:
         self.frame_count = 0
         self.background_blocks = []
         
-        from Environment2 import Environment
+        from Engine import Engine
         from State2 import State
-        self.env = Environment(State())
+        self.env = Engine(State())
+
+        self.fonts = {}  # (גודל, מודגש) -> Font, כי SysFont מחפש בגופני המערכת בכל קריאה
+        self.texts = {}  # (טקסט, גודל, צבע, מודגש) -> Surface של טקסט שכבר צויר
+        self._build_layers()
+        self.frame = {}  # לכל אלמנט במסך המשחק: (החתימה שלו בפריים הקודם, המלבן שלו)
+        self.dirty = []  # אזורים שצוירו ועוד לא עודכנו במסך, present מעדכן רק אותם
+        self.invalidate()
+
+    def _build_layers(self):  # השכבות שלא משתנות במהלך משחק: רקע, הלוח הריק וקווי הגריד
+        grid_px = 8 * self.GRID_SIZE
+        self.grid_rect = pygame.Rect(self.GRID_ORIGIN_X, self.GRID_ORIGIN_Y, grid_px, grid_px)
+
+        self.background = pygame.Surface((self.width, self.height))
+        self.background.fill(COLOR_DARK_BLUE)
+        pygame.draw.rect(self.background, COLOR_DARKER_BLUE, self.grid_rect)
+
+        # הקווים בשכבה שקופה נפרדת, כדי שיצוירו מעל המשבצות כמו קודם
+        self.grid_lines = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        for x in range(9):
+            pygame.draw.line(self.grid_lines, COLOR_DARK_BLUE,
+                             (self.GRID_ORIGIN_X + x * self.GRID_SIZE, self.GRID_ORIGIN_Y),
+                             (self.GRID_ORIGIN_X + x * self.GRID_SIZE, self.GRID_ORIGIN_Y + grid_px), 2)
+        for y in range(9):
+            pygame.draw.line(self.grid_lines, COLOR_DARK_BLUE,
+                             (self.GRID_ORIGIN_X, self.GRID_ORIGIN_Y + y * self.GRID_SIZE),
+                             (self.GRID_ORIGIN_X + grid_px, self.GRID_ORIGIN_Y + y * self.GRID_SIZE), 2)
+        self.grid_lines_rect = self.grid_lines.get_bounding_rect()
+        self.grid_area = self.grid_rect.union(self.grid_lines_rect)
+
+    def font(self, size, bold=False):
+        key = (size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont("Arial", size, bold=bold)
+            self.fonts[key] = font
+        return font
+
+    def text(self, content, size, color, bold=False):  # הטקסט נבנה מחדש רק כשהוא משתנה (למשל הניקוד)
+        key = (content, size, color, bold)
+        surface = self.texts.get(key)
+        if surface is None:
+            if len(self.texts) >= TEXT_CACHE_SIZE:
+                self.texts.clear()
+            surface = self.font(size, bold).render(content, True, color)
+            self.texts[key] = surface
+        return surface
+
+    def invalidate(self):  # המסך צויר מחוץ ל draw_game (תפריט, סוף משחק), הפריים הבא מצויר כולו
+        self.frame = {}
+
+    def present(self):  # במקום pygame.display.flip(): מעדכן במסך רק את האזורים שהשתנו
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
 
     def draw_game(self, state, dragging_block=None):
-        self.screen.fill(COLOR_DARK_BLUE)
-        self._draw_grid(state, dragging_block)
-        for block in state.Blocks:
-            self._draw_block(block)
-        
+        # לכל אלמנט חתימה של מה שהוא מציג. רק אלמנטים שהחתימה שלהם השתנתה מסמנים את המלבן הישן והחדש שלהם,
+        # ורק האזור הזה מצויר מחדש (מהרקע השמור) ומעודכן במסך ב present
+        placement = None
         if dragging_block:
-            self._highlight_full_lines(state, dragging_block)
-        
-        self._draw_score(state.score)
-
-        self._draw_combo_animation(state)
-        
-        close_button_rect = self._draw_close_button()
-        
-        return close_button_rect
+            placement = (id(dragging_block), dragging_block.rect.topleft, dragging_block.color)
+        blocks = tuple((id(block), block.rect.topleft, block.color) for block in state.Blocks)
+        combo = state.combo_count if state.in_combo and state.combo_count >= 2 else None
+        hover = self.get_close_button_rect().collidepoint(pygame.mouse.get_pos())
+        frame = {
+            "grid": ((state.Board.tobytes(), placement), self.grid_area),
+            "blocks": (blocks, self._blocks_rect(state.Blocks)),
+            "score": (state.score, self._score_layout(state.score)[2]),
+            "combo": (combo, self._combo_layout(combo)[2] if combo is not None else None),
+            "close": (hover, self.get_close_button_rect()),
+        }
+
+        if not self.frame:
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty = []
+            for name, (signature, rect) in frame.items():
+                old_signature, old_rect = self.frame[name]
+                if signature != old_signature:
+                    dirty.extend(r for r in (old_rect, rect) if r is not None)
+        self.frame = frame
+
+        if dirty:
+            self.screen.set_clip(dirty[0].unionall(dirty[1:]))
+            self.screen.blit(self.background, (0, 0))
+            self._draw_grid(state, dragging_block)
+            for block in state.Blocks:
+                self._draw_block(block)
+
+            if dragging_block:
+                self._highlight_full_lines(state, dragging_block)
+
+            self._draw_score(state.score)
+
+            self._draw_combo_animation(state)
+
+            self._draw_close_button()
+            self.screen.set_clip(None)
+            self.dirty.extend(dirty)
+
+        return self.get_close_button_rect()
+
+    def _blocks_rect(self, blocks):  # מלבן שמכיל את כל הבלוקים (block.rect הוא רק הפינה, לא הגודל של הצורה)
+        rects = [pygame.Rect(block.rect.x, block.rect.y,
+                             len(block.shape[0]) * self.GRID_SIZE + 1, len(block.shape) * self.GRID_SIZE + 1)
+                 for block in blocks]
+        return rects[0].unionall(rects[1:]) if rects else None
 
     def _draw_grid(self, state, dragging_block=None):
         grid = state.Board
-        grid_height, grid_width = grid.shape
-
-        grid_width_px = grid_width * self.GRID_SIZE
-        grid_height_px = grid_height * self.GRID_SIZE
-        grid_rect = pygame.Rect(self.GRID_ORIGIN_X, self.GRID_ORIGIN_Y, grid_width_px, grid_height_px)
-        pygame.draw.rect(self.screen, COLOR_DARKER_BLUE, grid_rect)
 
         if dragging_block:
             self._highlight_potential_placement(state, dragging_block)
 
-        for y in range(grid_height):
-            for x in range(grid_width):
-                cell_value = grid[y][x]
-                if cell_value != 0:
-                    color = self.get_color_from_id(cell_value)
-                    rect = pygame.Rect(
-                        self.GRID_ORIGIN_X + x * self.GRID_SIZE + self.GRID_MARGIN,
-                        self.GRID_ORIGIN_Y + y * self.GRID_SIZE + self.GRID_MARGIN,
-                        self.GRID_SIZE - 1.5 * self.GRID_MARGIN,
-                        self.GRID_SIZE - 1.5 * self.GRID_MARGIN
-                    )
-                    pygame.draw.rect(self.screen, color, rect, border_radius=5)
-                    pygame.draw.rect(self.screen, COLOR_DARK_BLUE, rect, width=2, border_radius=5)
-
-        for x in range(grid_width + 1):
-            pygame.draw.line(self.screen, COLOR_DARK_BLUE,
-                             (self.GRID_ORIGIN_X + x * self.GRID_SIZE, self.GRID_ORIGIN_Y),
-                             (self.GRID_ORIGIN_X + x * self.GRID_SIZE, self.GRID_ORIGIN_Y + grid_height_px), 2)
+        for y, x in zip(*grid.nonzero()):
+            color = self.get_color_from_id(grid[y][x])
+            rect = pygame.Rect(
+                self.GRID_ORIGIN_X + x * self.GRID_SIZE + self.GRID_MARGIN,
+                self.GRID_ORIGIN_Y + y * self.GRID_SIZE + self.GRID_MARGIN,
+                self.GRID_SIZE - 1.5 * self.GRID_MARGIN,
+                self.GRID_SIZE - 1.5 * self.GRID_MARGIN
+            )
+            pygame.draw.rect(self.screen, color, rect, border_radius=5)
+            pygame.draw.rect(self.screen, COLOR_DARK_BLUE, rect, width=2, border_radius=5)
 
-        for y in range(grid_height + 1):
-            pygame.draw.line(self.screen, COLOR_DARK_BLUE,
-                             (self.GRID_ORIGIN_X, self.GRID_ORIGIN_Y + y * self.GRID_SIZE),
-                             (self.GRID_ORIGIN_X + grid_width_px, self.GRID_ORIGIN_Y + y * self.GRID_SIZE), 2)
+        self.screen.blit(self.grid_lines, self.grid_lines_rect, area=self.grid_lines_rect)
             
     def _draw_block(self, block):
         for y in range(len(block.shape)):
@@ -102,9 +171,8 @@ class Graphics:
         ]
         return colors[(int(color_id)) % len(colors)]
 
-    def _draw_score(self, score):
-        font = pygame.font.SysFont("Arial", 48, bold=True)
-        score_text = font.render(f"Score: {score}", True, COLOR_WHITE)
+    def _score_layout(self, score):  # הטקסט של הניקוד, המיקום שלו והמסגרת סביבו
+        score_text = self.text(f"Score: {score}", 48, COLOR_WHITE, bold=True)
         text_rect = score_text.get_rect()
 
         grid_right_x = self.GRID_ORIGIN_X + self.GRID_SIZE * 8
@@ -115,6 +183,10 @@ class Graphics:
             text_rect.x - 20, text_rect.y - 20,
             text_rect.width + 40, text_rect.height + 40
         )
+        return score_text, text_rect, background_rect
+
+    def _draw_score(self, score):
+        score_text, text_rect, background_rect = self._score_layout(score)
         pygame.draw.rect(self.screen, COLOR_DARKER_BLUE, background_rect, border_radius=15)
 
         pygame.draw.rect(self.screen, COLOR_GOLD, background_rect, width=5, border_radius=15)
@@ -132,8 +204,7 @@ class Graphics:
 
         self. _draw_background_blocks()
 
-        font = pygame.font.SysFont("Arial", 72, bold=True)
-        game_over_text = font.render("Game Over", True, COLOR_RED)
+        game_over_text = self.text("Game Over", 72, COLOR_RED, bold=True)
         game_over_rect = game_over_text.get_rect(center=(self.width // 2, self.height // 4))
 
         game_over_background = pygame.Rect(
@@ -144,8 +215,7 @@ class Graphics:
         pygame.draw.rect(self.screen, COLOR_GOLD, game_over_background, width=5, border_radius=15)
         self.screen.blit(game_over_text, game_over_rect)
 
-        score_font = pygame.font.SysFont("Arial", 48, bold=True)
-        score_text = score_font.render(f"Your Score: {state.score}", True, COLOR_WHITE)
+        score_text = self.text(f"Your Score: {state.score}", 48, COLOR_WHITE, bold=True)
         score_rect = score_text.get_rect(center=(self.width // 2, self.height // 4 + 100))
 
         score_background = pygame.Rect(
@@ -162,7 +232,7 @@ class Graphics:
         restart_color = COLOR_GREEN if not restart_button.collidepoint(mouse_x, mouse_y) else (0, 200, 0)
         pygame.draw.rect(self.screen, restart_color, restart_button, border_radius=15)
         pygame.draw.rect(self.screen, COLOR_WHITE, restart_button, width=3, border_radius=15)
-        restart_text = pygame.font.SysFont("Arial", 48).render("Restart", True, COLOR_WHITE)
+        restart_text = self.text("Restart", 48, COLOR_WHITE)
         restart_text_rect = restart_text.get_rect(center=restart_button.center)
         self.screen.blit(restart_text, restart_text_rect)
 
@@ -170,33 +240,21 @@ class Graphics:
         main_menu_color = COLOR_BLUE if not main_menu_button.collidepoint(mouse_x, mouse_y) else (0, 0, 200)
         pygame.draw.rect(self.screen, main_menu_color, main_menu_button, border_radius=15)
         pygame.draw.rect(self.screen, COLOR_WHITE, main_menu_button, width=3, border_radius=15)
-        main_menu_text = pygame.font.SysFont("Arial", 48).render("Main Menu", True, COLOR_WHITE)
+        main_menu_text = self.text("Main Menu", 48, COLOR_WHITE)
         main_menu_text_rect = main_menu_text.get_rect(center=main_menu_button.center)
         self.screen.blit(main_menu_text, main_menu_text_rect)
 
         pygame.display.flip()
+        self.invalidate()
 
         return restart_button, main_menu_button
 
     def _highlight_potential_placement(self, state, block):
-        grid_x = int((block.rect.x - self.GRID_ORIGIN_X) / self.GRID_SIZE)
-        grid_y = int((block.rect.y - self.GRID_ORIGIN_Y) / self.GRID_SIZE)
+        grid_x, grid_y = self.layout.to_grid((block.rect.x, block.rect.y))
 
         if not self.env.is_valid_move(state, block, (grid_x, grid_y)):
             return
 
-        temp_board = state.Board.copy()
-        for y, row in enumerate(block.shape):
-            for x, cell in enumerate(row):
-                if cell == 1:
-                    board_x = grid_x + x
-                    board_y = grid_y + y
-                    if 0 <= board_x < temp_board.shape[1] and 0 <= board_y < temp_board.shape[0]:
-                        temp_board[board_y][board_x] = 1
-
-        rows_to_highlight = [y for y in range(temp_board.shape[0]) if all(temp_board[y, :] != 0)]
-        cols_to_highlight = [x for x in range(temp_board.shape[1]) if all(temp_board[:, x] != 0)]
-
         for y, row in enumerate(block.shape):
             for x, cell in enumerate(row):
                 if cell == 1:
@@ -215,31 +273,27 @@ class Graphics:
                         pygame.draw.rect(self.screen, color, rect, border_radius=5)
 
     def _highlight_full_lines(self, state, block):
-        grid_x = int((block.rect.x - self.GRID_ORIGIN_X) / self.GRID_SIZE)
-        grid_y = int((block.rect.y - self.GRID_ORIGIN_Y) / self.GRID_SIZE)
+        grid_x, grid_y = self.layout.to_grid((block.rect.x, block.rect.y))
 
         if not self.env.is_valid_move(state, block, (grid_x, grid_y)):
             return
 
-        temp_board = state.Board.copy()
-        for y, row in enumerate(block.shape):
-            for x, cell in enumerate(row):
-                if cell == 1:
-                    board_x = grid_x + x
-                    board_y = grid_y + y
-                    if 0 <= board_x < temp_board.shape[1] and 0 <= board_y < temp_board.shape[0]:
-                        temp_board[board_y][board_x] = 1
+        # שורה או עמודה יתמלאו אם המשבצות שכבר מלאות בהן ועוד המשבצות של הבלוק הן כל השורה, לפי המונים של המצב
+        row_sums, col_sums = Bitboard.line_sums(block.shape)
+        rows_to_highlight = [grid_y + i for i, n in enumerate(row_sums)
+                             if n and state.row_counts[grid_y + i] + n == BOARD_WIDTH]
+        cols_to_highlight = [grid_x + i for i, n in enumerate(col_sums)
+                             if n and state.col_counts[grid_x + i] + n == BOARD_HEIGHT]
+        if not rows_to_highlight and not cols_to_highlight:
+            return
 
-        rows_to_highlight = [y for y in range(temp_board.shape[0]) if all(temp_board[y, :] != 0)]
-        cols_to_highlight = [x for x in range(temp_board.shape[1]) if all(temp_board[:, x] != 0)]
+        covered = {(grid_x + x, grid_y + y)  # המשבצות של הבלוק עצמו לא נצבעות
+                   for y, row_cells in enumerate(block.shape)
+                   for x, cell in enumerate(row_cells) if cell == 1}
 
         for row in rows_to_highlight:
-            for col in range(temp_board.shape[1]):
-                if any(
-                    cell == 1 and grid_x + x == col and grid_y + y == row
-                    for y, row_cells in enumerate(block.shape)
-                    for x, cell in enumerate(row_cells)
-                ):
+            for col in range(BOARD_WIDTH):
+                if (col, row) in covered:
                     continue
 
                 rect = pygame.Rect(
@@ -251,12 +305,8 @@ class Graphics:
                 pygame.draw.rect(self.screen, COLOR_GOLD, rect, border_radius=5)
 
         for col in cols_to_highlight:
-            for row in range(temp_board.shape[0]):
-                if any(
-                    cell == 1 and grid_x + x == col and grid_y + y == row
-                    for y, row_cells in enumerate(block.shape)
-                    for x, cell in enumerate(row_cells)
-                ):
+            for row in range(BOARD_HEIGHT):
+                if (col, row) in covered:
                     continue
 
                 rect = pygame.Rect(
@@ -267,20 +317,23 @@ class Graphics:
                 )
                 pygame.draw.rect(self.screen, COLOR_GOLD, rect, border_radius=5)
 
-    def _draw_combo_animation(self, state):
-        if state.in_combo and state.combo_count >= 2:
-            font = pygame.font.SysFont("Arial", 36, bold=True)
-            combo_text = font.render(f"Combo x{state.combo_count}!", True, COLOR_GOLD)
-            text_rect = combo_text.get_rect()
+    def _combo_layout(self, combo_count):
+        combo_text = self.text(f"Combo x{combo_count}!", 36, COLOR_GOLD, bold=True)
+        text_rect = combo_text.get_rect()
 
-            grid_right_x = self.GRID_ORIGIN_X + self.GRID_SIZE * 8
-            center_x = (grid_right_x + self.width) / 2
-            text_rect.midtop = (center_x, self.GRID_ORIGIN_Y + 120)
+        grid_right_x = self.GRID_ORIGIN_X + self.GRID_SIZE * 8
+        center_x = (grid_right_x + self.width) / 2
+        text_rect.midtop = (center_x, self.GRID_ORIGIN_Y + 120)
 
-            background_rect = pygame.Rect(
-                text_rect.x - 10, text_rect.y - 10,
-                text_rect.width + 20, text_rect.height + 20
-            )
+        background_rect = pygame.Rect(
+            text_rect.x - 10, text_rect.y - 10,
+            text_rect.width + 20, text_rect.height + 20
+        )
+        return combo_text, text_rect, background_rect
+
+    def _draw_combo_animation(self, state):
+        if state.in_combo and state.combo_count >= 2:
+            combo_text, text_rect, background_rect = self._combo_layout(state.combo_count)
             pygame.draw.rect(self.screen, COLOR_LIGHT_BLUE, background_rect, border_radius=15)
 
             pygame.draw.rect(self.screen, COLOR_GOLD, background_rect, width=3, border_radius=15)
@@ -297,8 +350,7 @@ class Graphics:
 
         self. _draw_background_blocks()
 
-        font = pygame.font.SysFont("Arial", 72, bold=True)
-        title_text = font.render("Block Blast Game", True, COLOR_GOLD)
+        title_text = self.text("Block Blast Game", 72, COLOR_GOLD, bold=True)
         title_rect = title_text.get_rect(center=(self.width // 2, self.height // 4))
 
         background_rect = pygame.Rect(
@@ -315,7 +367,7 @@ class Graphics:
         play_color = COLOR_GREEN if not play_button.collidepoint(mouse_x, mouse_y) else (0, 200, 0)
         pygame.draw.rect(self.screen, play_color, play_button, border_radius=15)
         pygame.draw.rect(self.screen, COLOR_WHITE, play_button, width=3, border_radius=15)
-        play_text = pygame.font.SysFont("Arial", 48).render("Play", True, COLOR_WHITE)
+        play_text = self.text("Play", 48, COLOR_WHITE)
         play_text_rect = play_text.get_rect(center=play_button.center)
         self.screen.blit(play_text, play_text_rect)
 
@@ -323,7 +375,7 @@ class Graphics:
         train_color = COLOR_BLUE if not train_button.collidepoint(mouse_x, mouse_y) else (0, 0, 200)
         pygame.draw.rect(self.screen, train_color, train_button, border_radius=15)
         pygame.draw.rect(self.screen, COLOR_WHITE, train_button, width=3, border_radius=15)
-        train_text = pygame.font.SysFont("Arial", 48).render("AI Play", True, COLOR_WHITE)
+        train_text = self.text("AI Play", 48, COLOR_WHITE)
         train_text_rect = train_text.get_rect(center=train_button.center)
         self.screen.blit(train_text, train_text_rect)
 
@@ -331,11 +383,12 @@ class Graphics:
         quit_color = COLOR_RED if not quit_button.collidepoint(mouse_x, mouse_y) else (200, 0, 0)
         pygame.draw.rect(self.screen, quit_color, quit_button, border_radius=15)
         pygame.draw.rect(self.screen, COLOR_WHITE, quit_button, width=3, border_radius=15)
-        quit_text = pygame.font.SysFont("Arial", 48).render("Quit", True, COLOR_WHITE)
+        quit_text = self.text("Quit", 48, COLOR_WHITE)
         quit_text_rect = quit_text.get_rect(center=quit_button.center)
         self.screen.blit(quit_text, quit_text_rect)
 
         pygame.display.flip()
+        self.invalidate()
 
         return play_button, train_button, quit_button
 
@@ -1,16 +1,10 @@
 import pygame
+from Layout import Layout
 from CONSTANTS import *
 
 class HumanAgent:
     def __init__(self):
-        pygame.init()
-        info = pygame.display.get_desktop_sizes()[0]
-        self.width, self.height = info
-
-        self.GRID_ORIGIN_Y = self.height / 10
-        self.GRID_SIZE = self.width / 30
-        self.GRID_ORIGIN_X = (self.width / 2) - (self.GRID_SIZE * 4)
-        self.GRID_MARGIN = GRID_MARGIN
+        Layout().apply(self)
 
         self.selected_block = None
         self.offset_x = 0
@@ -0,0 +1,30 @@
+import pygame
+from CONSTANTS import *
+
+class Layout:  # מיקום הלוח על המסך והמרה בין פיקסלים למשבצות בגריד
+    def __init__(self):
+        pygame.init()  # אתחול pygame
+        info = pygame.display.get_desktop_sizes()[0]
+        self.width, self.height = info
+
+        self.GRID_ORIGIN_Y = self.height / 10
+        self.GRID_SIZE = self.width / 30
+        self.GRID_ORIGIN_X = (self.width / 2) - (self.GRID_SIZE * 4)
+        self.GRID_MARGIN = GRID_MARGIN
+
+    def apply(self, obj):  # מעתיק את מידות המסך והגריד לאובייקט (סביבה, סוכן או שחקן)
+        obj.width, obj.height = self.width, self.height
+        obj.GRID_ORIGIN_Y = self.GRID_ORIGIN_Y
+        obj.GRID_SIZE = self.GRID_SIZE
+        obj.GRID_ORIGIN_X = self.GRID_ORIGIN_X
+        obj.GRID_MARGIN = self.GRID_MARGIN
+
+    def to_grid(self, position):  # המרת מיקום פיקסלים למיקום גריד
+        # תוספת קטנה כדי שטעויות עיגול של float לא יורידו משבצת (למשל 2.9999 -> 2)
+        grid_x = int((position[0] - self.GRID_ORIGIN_X) / self.GRID_SIZE + 1e-6)
+        grid_y = int((position[1] - self.GRID_ORIGIN_Y) / self.GRID_SIZE + 1e-6)
+        return grid_x, grid_y
+
+    def to_pixels(self, grid_position):  # המרת מיקום גריד לפיקסלים של הפינה העליונה של המשבצת
+        grid_x, grid_y = grid_position
+        return self.GRID_ORIGIN_X + grid_x * self.GRID_SIZE, self.GRID_ORIGIN_Y + grid_y * self.GRID_SIZE
@@ -1,15 +1,29 @@
+import time
 import pygame
 from Graphics2 import Graphics
 from State2 import State
 from Environment2 import Environment
 from HumanAgent2 import HumanAgent
 from Ai_Agent2 import Ai_Agent
+from Game_Stats import GameStats
 from CONSTANTS import *
 
 class Game:
     def __init__(self):        
-        pass
+        self.ai_player = None  # סוכן הבינה המלאכותית, נוצר ונטען בפעם הראשונה שבוחרים בו
     
+    def get_ai_player(self): # מחזיר את סוכן הבינה המלאכותית, בלי לטעון שוב את המודל אחרי restart או חזרה לתפריט
+        if self.ai_player is None:
+            # CONSTANTSשחקן בינה מלאכותית - נטען מודל של מספר שמור ב
+            self.ai_player = Ai_Agent(train=False)
+            self.ai_player.load_model(MODEL_PATH_TEMPLATE.format(DEFAULT_MODEL_NUMBER))
+        self.ai_player.selected_block = None
+        return self.ai_player
+
+    def record_game(self, stats, state, player, game_start): # שומר את תוצאות המשחק שנגמר, עם מספר המודל אם שיחק הסוכן
+        model_number = DEFAULT_MODEL_NUMBER if isinstance(player, Ai_Agent) else None
+        stats.record(state, time.perf_counter() - game_start, model_number)
+
     def check_close_button(self, close_button_rect, events): # בודק אם המשתמק לחץ על הכפתור שסוגר את המשחק
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN and close_button_rect.collidepoint(event.pos):
@@ -20,6 +34,7 @@ class Game:
         # אתחול הגרפיקה וסביבת המשחק
         graphics = Graphics()
         env = Environment(State())
+        stats = GameStats(batch_size=1) # תוצאות המשחקים נשמרות ב game_stats.db מיד כשמשחק נגמר
         run = True
 
         # פותח תפריט ראשי ומגדיר את מצב השחקן לפי מה שהמשתמש בוחר
@@ -30,12 +45,11 @@ class Game:
             # שחקן אנושי
             player = HumanAgent()
         elif menu_action == "AI_PLAY":
-            # CONSTANTSשחקן בינה מלאכותית - נטען מודל של מספר שמור ב
-            player = Ai_Agent(train=False) # תפריט ראשי
-            player.load_model(MODEL_PATH_TEMPLATE.format(DEFAULT_MODEL_NUMBER))
+            player = self.get_ai_player() # תפריט ראשי
 
         env.reset()
         state = env.state
+        game_start = time.perf_counter() # תחילת המשחק, בשביל משך המשחק בסטטיסטיקה
         game_over = False
 
         # לולאת המשחק הראשית
@@ -63,6 +77,7 @@ class Game:
                             # אתחול משחק מחדש
                             env.reset()
                             state = env.state
+                            game_start = time.perf_counter()
                             game_over = False
                         elif main_menu_button.collidepoint(mouse_x, mouse_y):
                             # חזרה לתפריט הראשי ובחירה מחודשת של מצב המשחק
@@ -73,17 +88,18 @@ class Game:
                                 player = HumanAgent()
                                 env.reset()
                                 state = env.state
+                                game_start = time.perf_counter()
                                 game_over = False
                             elif menu_action == "AI_PLAY":
-                                player = Ai_Agent(train=False) # אחרי משחק
-                                player.load_model(MODEL_PATH_TEMPLATE.format(DEFAULT_MODEL_NUMBER))
+                                player = self.get_ai_player() # אחרי משחק
                                 env.reset()
                                 state = env.state
+                                game_start = time.perf_counter()
                                 game_over = False
             else:
                 # ציור המשחק
                 close_button_rect = graphics.draw_game(state, player.selected_block)
-                pygame.display.flip()
+                graphics.present()
 
                 if self.check_close_button(close_button_rect, events):
                     env.shutdown()
@@ -103,10 +119,12 @@ class Game:
 
                     if env.is_game_over(state):
                         game_over = True
+                        self.record_game(stats, state, player, game_start)
                 else:
                     # אין פעולה (השחקן לא עשה כלום)
                     if env.is_game_over(state):
                         game_over = True
+                        self.record_game(stats, state, player, game_start)
 
     def main_menu(self, graphics):
         while True:
@@ -0,0 +1,197 @@
+import atexit
+import csv
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from CONSTANTS import *
+
+
+# כל sink מקבל רשומות (time, step, metrics) בבאצ'ים מתהליכון הכתיבה, open נקרא מאותו תהליכון
+class CsvSink:  # קובץ CSV בפורמט ארוך: שורה לכל מדד
+    def __init__(self, directory, run_id, config):
+        self.path = os.path.join(directory, f"{run_id}.csv")
+        self.config_path = os.path.join(directory, f"{run_id}.config.json")
+        self.config = config
+        self.file = None
+
+    def open(self):
+        new_file = not os.path.exists(self.path)
+        self.file = open(self.path, "a", newline="")
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(["time", "step", "key", "value"])
+        with open(self.config_path, "w") as f:
+            json.dump(self.config, f, indent=2, default=str)
+
+    def write(self, records):
+        for t, step, metrics in records:
+            for key, value in metrics.items():
+                self.writer.writerow([t, step, key, value])
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class SqliteSink:  # טבלת metrics אחת לכל הריצות, וטבלת runs עם ההגדרות של כל ריצה
+    def __init__(self, directory, run_id, config):
+        self.path = os.path.join(directory, "metrics.db")
+        self.run_id = run_id
+        self.config = config
+        self.conn = None
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # קוראים (למשל מחברת) לא חוסמים את הכתיבה
+        self.conn.execute("CREATE TABLE IF NOT EXISTS runs (run TEXT PRIMARY KEY, started REAL, config TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS metrics (run TEXT, time REAL, step INTEGER, key TEXT, value REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS metrics_run_key ON metrics (run, key)")
+        self.conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)",
+                          (self.run_id, time.time(), json.dumps(self.config, default=str)))
+        self.conn.commit()
+
+    def write(self, records):
+        rows = [(self.run_id, t, step, key, value)
+                for t, step, metrics in records for key, value in metrics.items()]
+        self.conn.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?)", rows)  # טרנזקציה אחת לכל באצ'
+        self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class ParquetSink:  # קובץ Parquet, row group לכל באצ'. דורש pyarrow
+    def __init__(self, directory, run_id, config):
+        import pyarrow  # נבדק כבר ביצירה, כדי שחבילה חסרה תתגלה לפני האימון ולא בתהליכון
+        self.path = os.path.join(directory, f"{run_id}.parquet")
+        self.run_id = run_id
+        self.config = config
+        self.writer = None
+
+    def open(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([("time", pa.float64()), ("step", pa.int64()), ("key", pa.string()), ("value", pa.float64())],
+                                metadata={"run": self.run_id, "config": json.dumps(self.config, default=str)})
+        self.writer = pq.ParquetWriter(self.path, self.schema)
+
+    def write(self, records):
+        columns = {"time": [], "step": [], "key": [], "value": []}
+        for t, step, metrics in records:
+            for key, value in metrics.items():
+                columns["time"].append(t)
+                columns["step"].append(step)
+                columns["key"].append(key)
+                columns["value"].append(float(value))
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class WandbSink:  # Weights & Biases, רק אם הוא מותקן ומוגדר ב METRICS_BACKENDS
+    def __init__(self, directory, run_id, config):
+        import wandb
+        self.wandb = wandb
+        self.run_id = run_id
+        self.config = config
+        self.run = None
+
+    def open(self):
+        self.run = self.wandb.init(project=WANDB_PROJECT, entity=WANDB_ENTITY, id=self.run_id, name=self.run_id,
+                                   resume=False, config=self.config)
+
+    def write(self, records):
+        for t, step, metrics in records:
+            self.run.log(metrics, step=step)  # אותו מונה צעדים כמו ב sinks האחרים, לא המונה הפנימי של wandb
+
+    def close(self):
+        if self.run is not None:
+            self.run.finish()
+
+
+SINKS = {
+    "csv": CsvSink,
+    "sqlite": SqliteSink,
+    "parquet": ParquetSink,
+    "wandb": WandbSink,
+}
+
+
+class MetricsLogger:  # log לא חוסם: הרשומות נכנסות לתור ותהליכון ברקע כותב אותן בבאצ'ים לכל ה sinks
+    def __init__(self, sinks, flush_seconds=METRICS_FLUSH_SECONDS, batch_size=METRICS_BATCH_SIZE):
+        self.sinks = sinks
+        self.flush_seconds = flush_seconds  # כל כמה זמן לכתוב את מה שהצטבר
+        self.batch_size = batch_size  # או מוקדם יותר אם הצטברו כל כך הרבה רשומות
+        self.queue = queue.SimpleQueue()
+        self.closed = False
+        self.thread = threading.Thread(target=self._writer, name="metrics-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)  # גם אם האימון נעצר באמצע, מה שבתור נכתב
+
+    def log(self, metrics, step=None):
+        if not self.closed:
+            self.queue.put((time.time(), step, dict(metrics)))
+
+    def _writer(self):
+        opened = []
+        for sink in self.sinks:
+            try:
+                sink.open()
+                opened.append(sink)
+            except Exception as e:  # למשל wandb בלי רשת - ממשיכים עם שאר ה sinks
+                print(f"Metrics sink {type(sink).__name__} failed to open: {e}")
+        self.sinks = opened
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        running = True
+        while running:
+            try:
+                record = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if record is None:  # סימן סגירה
+                    running = False
+                else:
+                    batch.append(record)
+            except queue.Empty:
+                pass
+            if batch and (not running or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+        for sink in self.sinks:
+            sink.close()
+
+    def _write(self, batch):
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception as e:  # sink אחד שנכשל לא עוצר את האימון ולא את שאר ה sinks
+                print(f"Metrics sink {type(sink).__name__} failed: {e}")
+
+    def close(self):  # כותב את כל מה שנשאר בתור ומחכה לתהליכון
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+
+def make_logger(run_id, config=None, backends=METRICS_BACKENDS, directory=METRICS_DIRECTORY):
+    os.makedirs(directory, exist_ok=True)
+    sinks = []
+    for backend in backends:
+        if backend not in SINKS:
+            raise ValueError(f"Unknown metrics backend: {backend}")
+        try:
+            sinks.append(SINKS[backend](directory, run_id, config or {}))
+        except ImportError as e:  # parquet / wandb הם אופציונליים
+            print(f"Metrics backend '{backend}' is not available ({e}), skipping it")
+    return MetricsLogger(sinks)
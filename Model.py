@@ -1,8 +1,7 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from State2 import State
-from Environment2 import Environment
+from typing import Optional, Tuple
 from CONSTANTS import *
 
 class DQN(nn.Module):
@@ -46,13 +45,7 @@ class DQN(nn.Module):
         # ומפיקה ערך קיו יחיד עבור כל מצב
         self.fc3 = nn.Linear(64, 1)  # 64 -> 1 (Q-value output)
 
-
-        self.env = Environment(State())  # יצירת סביבה עם מצב התחלתי
-        self.Current_State = State()  # מצב נוכחי חדש
-        self.State_Tensor = self.Current_State.TensorState(self.Current_State.Board)  # טנסור מצב מהלוח
-        self.All_Moves = self.env.GetAllPossibleMoves(self.Current_State)  # כל המהלכים האפשריים
-        self.All_After_States = self.env.AfterState(self.Current_State, self.All_Moves)  # כל המצבים לאחר כל המהלכים
-        
+        # הבנאי רק יוצר את השכבות, בלי סביבה ובלי מצבים, כדי שיצירת מודל בתהליכים נוספים תהיה זולה
         
     def forward(self, All_After_States):  # של כל מצב Qמעביר את המצבים דרך הרשת ומחזיר את ערך ה 
 
@@ -96,8 +89,43 @@ class DQN(nn.Module):
         # מחזיר את ערך השגיאה בשביל שבעזרתו נעדכן את משקלי הרשת
         return mse_loss
     
+    def export_torchscript(self, path):  # שמירת המודל כ TorchScript, לטעינה בלי קוד הפייתון של המחלקה
+        torch.jit.script(self).save(path)
+
     def loadModel (self, file):  # טעינת מודל שמור מקובץ
         self.model = torch.load(file)
     
     def save_param (self, path):  # שומר את משקלי המודל לקובץ
-        self.DQN.save_params(path)
\ No newline at end of file
+        self.DQN.save_params(path)
+
+
+class DQNLearner(nn.Module):
+    # צעד למידה אחד כמודול אחד: קיו של הרשת המקוונת, קיו של רשת היעד (בלי גרדיאנטים), מטרות Bellman ו loss,
+    # כך שאפשר להריץ את כולו כגרף אחד של TorchScript או torch.compile
+    def __init__(self, online: DQN, target: DQN, gamma: float = GAMMA):
+        super(DQNLearner, self).__init__()
+        self.online = online
+        self.target = target
+        self.gamma = gamma
+
+    def forward(self, states, rewards, next_states, dones, weights: Optional[torch.Tensor] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        Q_values = self.online(states)
+        with torch.no_grad():  # רשת היעד לא נכנסת לגרף הגרדיאנטים
+            Q_hat_values = self.target(next_states)
+            target_q_values = rewards + self.gamma * Q_hat_values * (1 - dones)  # מטרות על בסיס Bellman
+        td_errors = target_q_values - Q_values
+        if weights is None:
+            loss = (td_errors ** 2).mean()  # MSE
+        else:
+            loss = (weights * td_errors ** 2).mean()  # MSE ממושקל לפי importance sampling
+        return loss, td_errors.detach()
+
+
+def compile_learner(learner, mode=LEARNER_COMPILE):  # "eager", "compile" (torch.compile) או "script" (TorchScript)
+    if mode == "script":
+        return torch.jit.script(learner)
+    if mode == "compile":
+        return torch.compile(learner)
+    if mode == "eager":
+        return learner
+    raise ValueError(f"Unknown learner compile mode: {mode}")
@@ -0,0 +1,149 @@
+import contextlib
+import cProfile
+import csv
+import os
+import pstats
+import time
+import numpy as np
+import torch
+from CONSTANTS import *
+
+_NO_STAGE = contextlib.nullcontext()  # מה שמוחזר כשהטיימרים כבויים, בלי הקצאה ובלי מדידה
+
+
+class _Stage:  # מודד זמן של בלוק with אחד ושומר אותו ברשימה של השלב
+    __slots__ = ("times", "start")
+
+    def __init__(self, times):
+        self.times = times
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.times.append(time.perf_counter() - self.start)
+        return False
+
+
+class StageTimer:  # טיימרים לכל שלב בלולאת האימון: צעדים לשנייה, באצ'ים לשנייה ואחוזונים של זמן כל שלב
+    def __init__(self, enabled=PROFILE_STAGES, report_every=PROFILE_REPORT_EVERY, outputs=PROFILE_OUTPUTS,
+                 csv_path=PROFILE_CSV_PATH, log=None):
+        self.enabled = enabled
+        self.report_every = report_every  # כל כמה צעדים לדווח
+        self.outputs = outputs  # "stdout", "csv" ו/או "metrics"
+        self.csv_path = csv_path
+        self.log = log  # פונקציה שמקבלת מילון מדדים (למשל MetricsLogger.log), בשביל "metrics"
+        self.stages = {}  # שם השלב -> _Stage
+        self.total_steps = 0
+        self.reset_window()
+
+    def reset_window(self):
+        for stage in self.stages.values():
+            stage.times.clear()
+        self.steps = 0
+        self.batches = 0
+        self.window_start = time.perf_counter()
+
+    def stage(self, name):  # with timer.stage("sample"): ...
+        if not self.enabled:
+            return _NO_STAGE
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = _Stage([])
+            self.stages[name] = stage
+        return stage
+
+    def step(self, sampled=False):  # נקרא פעם אחת בכל צעד של הסביבה, sampled אם היה גם צעד למידה
+        if not self.enabled:
+            return
+        self.steps += 1
+        self.total_steps += 1
+        self.batches += sampled
+        if self.steps >= self.report_every:
+            self.report()
+
+    def summary(self):  # המדדים של החלון הנוכחי
+        elapsed = time.perf_counter() - self.window_start
+        metrics = {
+            "steps_per_sec": self.steps / elapsed,
+            "batches_per_sec": self.batches / elapsed,
+        }
+        for name, stage in self.stages.items():
+            if not stage.times:
+                continue
+            times = np.array(stage.times) * 1000  # ms
+            p50, p95, p99 = np.percentile(times, [50, 95, 99])
+            metrics[f"{name}/p50_ms"] = p50
+            metrics[f"{name}/p95_ms"] = p95
+            metrics[f"{name}/p99_ms"] = p99
+            metrics[f"{name}/share"] = times.sum() / 1000 / elapsed  # החלק מזמן החלון שהלך על השלב
+        return metrics
+
+    def report(self):
+        metrics = self.summary()
+        if "stdout" in self.outputs:
+            print(f"\n--- Profile (step {self.total_steps}) {metrics['steps_per_sec']:.1f} steps/sec, "
+                  f"{metrics['batches_per_sec']:.1f} batches/sec ---")
+            for name in self.stages:
+                if f"{name}/p50_ms" in metrics:
+                    print(f"{name:<14} p50 {metrics[f'{name}/p50_ms']:8.3f} ms  p95 {metrics[f'{name}/p95_ms']:8.3f} ms  "
+                          f"p99 {metrics[f'{name}/p99_ms']:8.3f} ms  {metrics[f'{name}/share']:6.1%}")
+        if "csv" in self.outputs:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["time", "step", "metric", "value"])
+                now = time.time()
+                for key, value in metrics.items():
+                    writer.writerow([now, self.total_steps, key, value])
+        if "metrics" in self.outputs and self.log is not None:
+            self.log({f"profile/{key}": value for key, value in metrics.items()})
+        self.reset_window()
+        return metrics
+
+
+class ProfileWindow:  # מריץ cProfile או torch.profiler על חלון של steps צעדים שמתחיל בצעד start
+    def __init__(self, tool=PROFILER, start=PROFILER_START_STEP, steps=PROFILER_STEPS, path=PROFILER_OUTPUT_PATH):
+        self.tool = tool  # None, "cprofile" או "torch"
+        self.start = start
+        self.end = start + steps
+        self.path = path
+        self.profiler = None
+        self.count = 0
+
+    def step(self):  # נקרא פעם אחת בכל צעד
+        if self.tool is None:
+            return
+        if self.count == self.start:
+            self.begin()
+        self.count += 1
+        if self.count == self.end:
+            self.finish()
+
+    def begin(self):
+        if self.tool == "cprofile":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.tool == "torch":
+            self.profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True)
+            self.profiler.__enter__()
+        else:
+            raise ValueError(f"Unknown profiler: {self.tool}")
+
+    def finish(self):
+        if self.profiler is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.tool == "cprofile":
+            self.profiler.disable()
+            self.profiler.dump_stats(f"{self.path}.prof")  # לפתוח עם snakeviz או pstats
+            pstats.Stats(self.profiler).sort_stats("cumulative").print_stats(25)
+        else:
+            self.profiler.__exit__(None, None, None)
+            self.profiler.export_chrome_trace(f"{self.path}.json")  # לפתוח ב chrome://tracing או Perfetto
+            print(self.profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=25))
+        self.profiler = None
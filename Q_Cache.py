@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import numpy as np
+import torch
+from CONSTANTS import *
+
+
+def board_keys(boards):  # מפתח מדויק של 16 בתים לכל לוח צבעים (N, 64): שני מישורי ביטים, כי בכל משבצת יש ערך 0..3
+    low = np.packbits(boards & 1, axis=1, bitorder='little')
+    high = np.packbits((boards >> 1) & 1, axis=1, bitorder='little')
+    keys = np.ascontiguousarray(np.concatenate([low, high], axis=1))
+    return keys.view(np.dtype((np.void, 16))).ravel()
+
+
+class QCache:  # מטמון LRU של ערכי הקיו לפי הלוח. מתרוקן כשמחליפים מודל, ומי שמשנה את המשקלים במקום קורא ל invalidate
+    def __init__(self, capacity=Q_CACHE_SIZE):
+        self.capacity = capacity
+        self.table = OrderedDict()  # מפתח הלוח -> ערך הקיו, מהישן לחדש
+        self.model = None  # המודל שהערכים בטבלה חושבו איתו
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0  # לוחות שהופיעו יותר מפעם אחת באותה קריאה
+        self.invalidations = 0
+
+    def invalidate(self):  # המשקלים השתנו (למשל load_state_dict), הערכים בטבלה כבר לא נכונים
+        if self.table:
+            self.invalidations += 1
+        self.table.clear()
+
+    def values(self, model, boards):  # ערכי הקיו של מערך לוחות (N, 64), רק לוחות שונים שלא בטבלה עוברים ברשת
+        if model is not self.model:
+            self.invalidate()
+            self.model = model
+
+        keys, first, inverse = np.unique(board_keys(boards), return_index=True, return_inverse=True)
+        self.duplicates += len(boards) - len(keys)
+        values = np.empty(len(keys), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(keys.tolist()):
+            value = self.table.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                self.table.move_to_end(key)
+                values[i] = value
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            tensors = torch.from_numpy(boards[first[missing]].astype(np.float32)).view(-1, 1, 8, 8)
+            with torch.no_grad():
+                q_values = model(tensors).view(-1).numpy()
+            values[missing] = q_values
+            for i, value in zip(missing, q_values.tolist()):
+                self.table[keys[i].tobytes()] = value
+            while len(self.table) > self.capacity:
+                self.table.popitem(last=False)
+        return values[inverse.reshape(-1)]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "duplicates": self.duplicates,
+            "invalidations": self.invalidations,
+            "size": len(self.table),
+        }
@@ -0,0 +1,97 @@
+import queue
+import time
+import torch.multiprocessing as mp
+from CONSTANTS import *
+
+
+def snapshot(state, selected_block):  # מה שצריך כדי לצייר את המצב, בלי טנסורים ובלי מטמונים של המנוע
+    def block_data(block):
+        return block.shape_id, block.color_id, (block.rect.x, block.rect.y)  # הצורה כאינדקס בקטלוג
+    selected = block_data(selected_block) if selected_block is not None and selected_block.rect is not None else None
+    return (state.Board.copy(), state.bits, list(state.row_counts), list(state.col_counts),
+            [block_data(block) for block in state.Blocks], selected, state.score, state.combo_count, state.in_combo)
+
+
+def render_loop(frames, stop, fps):  # רץ בתהליך נפרד: מצייר את הצילום האחרון שהגיע, לכל היותר fps פעמים בשנייה
+    import pygame
+    from Graphics2 import Graphics
+    from Block import Block
+    from State2 import State
+
+    def make_block(data):
+        shape_id, color_id, (x, y) = data
+        return Block.from_id(shape_id, pygame.Rect(x, y, 50, 50), color_id)
+
+    graphics = Graphics()
+    clock = pygame.time.Clock()
+    state, selected = None, None
+    while not stop.is_set():
+        for event in pygame.event.get():  # סגירת החלון או לחיצה על כפתור הסגירה עוצרות את האימון
+            if event.type == pygame.QUIT:
+                stop.set()
+            elif event.type == pygame.MOUSEBUTTONDOWN and graphics.get_close_button_rect().collidepoint(event.pos):
+                stop.set()
+
+        try:
+            frame = frames.get_nowait()
+        except queue.Empty:
+            frame = None
+        if frame is not None:
+            board, bits, row_counts, col_counts, blocks, selected, score, combo_count, in_combo = frame
+            state = State()
+            state.Board, state.bits, state.score = board, bits, score
+            state.row_counts, state.col_counts = row_counts, col_counts  # בשביל הדגשת השורות שיתמלאו
+            state.combo_count, state.in_combo = combo_count, in_combo
+            state.Blocks = tuple(make_block(data) for data in blocks)
+            selected = make_block(selected) if selected is not None else None
+
+        if state is not None:
+            graphics.draw_game(state, selected)
+            graphics.present()
+        clock.tick(fps)
+    pygame.quit()
+
+
+class RenderProcess:  # ציור האימון בתהליך נפרד, כך שלולאת האימון לא מחכה ל vsync ול SDL
+    def __init__(self, enabled=TRAIN_RENDER, fps=TRAIN_RENDER_FPS, every=TRAIN_RENDER_EVERY):
+        self.enabled = enabled
+        self.every = every  # מציירים רק כל every משחקים
+        self.interval = 1 / fps  # שניות בין צילומים
+        self.active = False  # האם המשחק הנוכחי מצויר
+        self.next_frame = 0.0
+        self.process = None
+        if enabled:
+            ctx = mp.get_context("spawn")  # תהליך נקי, בלי המצב של pygame ו torch מהתהליך הראשי
+            self.frames = ctx.Queue(maxsize=1)  # רק הצילום האחרון מחכה, צילום שלא נכנס נזרק
+            self.stop = ctx.Event()  # נקבע כשסוגרים את החלון או כשהאימון נגמר
+            self.process = ctx.Process(target=render_loop, args=(self.frames, self.stop, fps), daemon=True)
+            self.process.start()
+
+    @property
+    def stopped(self):  # המשתמש סגר את החלון
+        return self.process is not None and self.stop.is_set()
+
+    def start_episode(self, episode):
+        self.active = self.process is not None and episode % self.every == 0
+
+    def submit(self, state, selected_block=None):  # לא חוסם: אם עוד לא עבר interval או שהתור מלא, הצילום לא נשלח
+        if not self.active:
+            return
+        now = time.perf_counter()
+        if now < self.next_frame:
+            return
+        self.next_frame = now + self.interval
+        try:
+            self.frames.put_nowait(snapshot(state, selected_block))
+        except queue.Full:
+            pass
+
+    def close(self):
+        if self.process is None:
+            return
+        self.stop.set()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.frames.cancel_join_thread()  # לא מחכים לצילום שנשאר בתור
+        self.process = None
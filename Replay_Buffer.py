@@ -1,13 +1,19 @@
 from collections import deque
+import json
+import os
 import random
+import numpy as np
 import torch
+from CONSTANTS import REPLAY_BUFFER_STORAGE, MEMMAP_BUFFER_DIRECTORY, PER_ALPHA, PER_BETA_START, PER_BETA_STEPS, PER_EPSILON
 
 capacity = 100000
 
 class ReplayBuffer:
+    prioritized = False  # sample מחזיר רק את חמשת הטנסורים
+
     def __init__(self, capacity= capacity, path = None) -> None:
         if path:
-            self.buffer = torch.load(path).buffer
+            self.buffer = torch.load(path, weights_only=False).buffer
         else:
             # יוצר deque מעגלי עם אורך מקסימלי
             self.buffer = deque(maxlen=capacity)
@@ -15,6 +21,12 @@ class ReplayBuffer:
     # שמירת דוגמה חדשה ל buffer
     def push (self, state, action, reward, next_state, done):
         self.buffer.append((state, action, reward, next_state, done))
+
+    # שמירת כמה דוגמאות בבת אחת, כל מערך מכיל דוגמה בכל שורה
+    def push_batch (self, states, actions, rewards, next_states, dones):
+        for i in range(len(states)):
+            self.push(states[i].float().view(1, 8, 8), actions[i].view(1, 2), rewards[i].view(1, 1),
+                      next_states[i].float().view(1, 8, 8), dones[i].float().view(1, 1))
     
     # דגימה אקראית של באצ' מתוך ה buffer
     def sample (self, batch_size):
@@ -41,3 +53,220 @@ class ReplayBuffer:
     # אורך הBuffer
     def __len__(self):
         return len(self.buffer)
+
+
+class TensorReplayBuffer:
+    # buffer מעגלי בטנסורים רציפים בגודל קבוע: לוחות ב uint8, תגמולים ב float, סיום ב bool
+    prioritized = False
+    FIELDS = {  # שם -> (צורה של דוגמה אחת, סוג)
+        "states": ((8, 8), np.uint8),
+        "actions": ((2,), np.float32),
+        "rewards": ((1,), np.float32),
+        "next_states": ((8, 8), np.uint8),
+        "dones": ((1,), np.bool_),
+    }
+
+    def __init__(self, capacity= capacity) -> None:
+        self.capacity = capacity
+        for name, (shape, dtype) in self.FIELDS.items():
+            setattr(self, name, self._allocate(name, (capacity,) + shape, dtype))
+        self.cursor = 0  # המקום הבא לכתיבה
+        self.size = 0  # כמה דוגמאות שמורות
+
+    def _allocate(self, name, shape, dtype):  # מקצה טנסור רציף לשדה אחד
+        return torch.from_numpy(np.zeros(shape, dtype=dtype))
+
+    # שמירת דוגמה חדשה במקום של הסמן, מחליפה את הישנה ביותר כשה buffer מלא
+    def push (self, state, action, reward, next_state, done):
+        i = self.cursor
+        self.states[i] = state.reshape(8, 8)
+        self.actions[i] = action.reshape(2)
+        self.rewards[i] = reward.reshape(1)
+        self.next_states[i] = next_state.reshape(8, 8)
+        self.dones[i] = done.reshape(1)
+        self.cursor = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    # שמירת כמה דוגמאות בבת אחת בכתיבה רציפה (עם גלישה לתחילת ה buffer)
+    def push_batch (self, states, actions, rewards, next_states, dones):
+        n = len(states)
+        idx = (self.cursor + torch.arange(n)) % self.capacity
+        self.states[idx] = states.reshape(n, 8, 8).to(torch.uint8)
+        self.actions[idx] = actions.reshape(n, 2).float()
+        self.rewards[idx] = rewards.reshape(n, 1).float()
+        self.next_states[idx] = next_states.reshape(n, 8, 8).to(torch.uint8)
+        self.dones[idx] = dones.reshape(n, 1).bool()
+        self.cursor = (self.cursor + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    # דגימה אקראית עם אינדקסים מ torch.randint ושליפה אחת מכל טנסור, בלי תלות בגודל ה buffer
+    def sample (self, batch_size):
+        if (batch_size > self.__len__()):
+            batch_size = self.__len__()
+        idx = torch.randint(0, self.size, (batch_size,))
+        states = self.states[idx].float().unsqueeze(1)
+        next_states = self.next_states[idx].float().unsqueeze(1)
+        return states, self.actions[idx], self.rewards[idx], next_states, self.dones[idx].float()
+
+    def __len__(self):
+        return self.size
+
+
+class MemmapReplayBuffer(TensorReplayBuffer):
+    # buffer מעגלי בקבצי np.memmap בתיקייה, עם header קטן. הדוגמאות נכתבות ישר לקבצים
+    # והפעלה מחדש רק ממפה את הקבצים שוב, כך שה buffer לא חייב להיכנס לזיכרון
+    HEADER = "header.json"
+
+    def __init__(self, directory=MEMMAP_BUFFER_DIRECTORY, capacity= capacity) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        header = self._read_header()
+        self.mode = "r+" if header else "w+"  # ממפה קבצים קיימים או יוצר חדשים
+        self.maps = {}  # קבצי ה memmap של כל שדה
+        super().__init__(capacity=header["capacity"] if header else capacity)
+        if header:
+            self.cursor = header["cursor"]
+            self.size = header["size"]
+        else:
+            self.flush()
+
+    def _read_header(self):
+        path = os.path.join(self.directory, self.HEADER)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _allocate(self, name, shape, dtype):  # טנסור שמשתף את הזיכרון עם קובץ memmap
+        path = os.path.join(self.directory, f"{name}.{np.dtype(dtype).name}")
+        self.maps[name] = np.memmap(path, dtype=dtype, mode=self.mode, shape=shape)
+        return torch.from_numpy(self.maps[name])
+
+    def flush(self):  # כותב את הדפים לדיסק ואז את ה header (קודם לקובץ זמני ואז החלפה)
+        for memmap in self.maps.values():
+            memmap.flush()
+        header = {"capacity": self.capacity, "cursor": self.cursor, "size": self.size}
+        path = os.path.join(self.directory, self.HEADER)
+        with open(path + ".tmp", "w") as f:
+            json.dump(header, f)
+        os.replace(path + ".tmp", path)
+
+
+class SumTree:
+    # עץ סכומים במערך: העלים הם העדיפויות וכל צומת הוא סכום שני הילדים שלו.
+    # עדכון ודגימה ב O(log n), ושניהם עובדים על באצ' שלם של אינדקסים בבת אחת
+    def __init__(self, capacity):
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)  # השורש באינדקס 1, העלים מ leaves
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[np.asarray(indices) + self.leaves]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices) + self.leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:  # מעדכן את הסכומים רמה אחרי רמה עד השורש
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):  # לכל ערך בין 0 לסכום הכולל, מוצא את העלה שהסכום המצטבר שלו מכיל אותו
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).copy()
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            go_right = values > self.tree[left]
+            values -= np.where(go_right, self.tree[left], 0.0)
+            nodes = left + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(TensorReplayBuffer):
+    # דגימה לפי עדיפות (גודל שגיאת ה TD) עם משקלי importance sampling
+    prioritized = True  # sample מחזיר גם אינדקסים ומשקלים
+
+    def __init__(self, capacity= capacity, alpha=PER_ALPHA, beta_start=PER_BETA_START, beta_steps=PER_BETA_STEPS, epsilon=PER_EPSILON, seed=None) -> None:
+        super().__init__(capacity=capacity)
+        self.rng = np.random.default_rng(seed)  # מחולל משלו לדגימה, כך שריצה עם זרע קבוע חוזרת על עצמה
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta_start = beta_start
+        self.beta_steps = beta_steps
+        self.epsilon = epsilon
+        self.max_priority = 1.0  # דוגמאות חדשות מקבלות את העדיפות הגבוהה ביותר כדי שיידגמו לפחות פעם אחת
+        self.samples = 0  # כמה פעמים דגמנו, בשביל להעלות את בטא ל 1
+
+    def __setstate__(self, state):  # buffer שנשמר לפני שהיה לו מחולל משלו
+        self.__dict__.update(state)
+        if "rng" not in state:
+            self.rng = np.random.default_rng()
+
+    def push (self, state, action, reward, next_state, done):
+        self.tree.update([self.cursor], [self.max_priority ** self.alpha])
+        super().push(state, action, reward, next_state, done)
+
+    def push_batch (self, states, actions, rewards, next_states, dones):
+        idx = (self.cursor + np.arange(len(states))) % self.capacity
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+        super().push_batch(states, actions, rewards, next_states, dones)
+
+    def beta(self):
+        fraction = min(self.samples / self.beta_steps, 1.0)
+        return self.beta_start + fraction * (1.0 - self.beta_start)
+
+    # דגימה מרובדת: הסכום הכולל מחולק ל batch_size קטעים ונדגם ערך אחד מכל קטע
+    def sample (self, batch_size):
+        if (batch_size > self.__len__()):
+            batch_size = self.__len__()
+        total = self.tree.total()
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = np.minimum(self.tree.find(np.minimum(values, total * (1 - 1e-12))), self.size - 1)
+
+        probs = self.tree.get(idx) / total
+        weights = (self.size * probs) ** (-self.beta())
+        weights /= weights.max()
+        self.samples += 1
+
+        index = torch.from_numpy(idx)
+        states = self.states[index].float().unsqueeze(1)
+        next_states = self.next_states[index].float().unsqueeze(1)
+        weights = torch.tensor(weights, dtype=torch.float32).view(-1, 1)
+        return states, self.actions[index], self.rewards[index], next_states, self.dones[index].float(), idx, weights
+
+    # עדכון העדיפויות של כל הבאצ' בבת אחת אחרי חישוב ה loss
+    def update_priorities (self, indices, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64).reshape(-1)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+
+# יוצר buffer לפי סוג האחסון: "deque" (הרשימה המקורית), "tensor" (טנסורים רציפים), "memmap" (קבצים בדיסק)
+# או "prioritized" (טנסורים רציפים עם דגימה לפי עדיפות). seed משמש את הדגימה של "prioritized"
+def make_buffer (storage=REPLAY_BUFFER_STORAGE, capacity= capacity, path = None, seed=None):
+    if storage == "deque":
+        return ReplayBuffer(capacity=capacity, path=path)
+    if storage == "tensor":
+        if path:
+            return torch.load(path, weights_only=False)
+        return TensorReplayBuffer(capacity=capacity)
+    if storage == "memmap":
+        return MemmapReplayBuffer(directory=path or MEMMAP_BUFFER_DIRECTORY, capacity=capacity)
+    if storage == "prioritized":
+        if path:
+            return torch.load(path, weights_only=False)
+        return PrioritizedReplayBuffer(capacity=capacity, seed=seed)
+    raise ValueError(f"Unknown replay buffer storage: {storage}")
+
+
+# שמירת ה buffer: ב memmap מספיק לכתוב את הדפים וה header, בשאר הסוגים שומרים את כל האובייקט
+def save_buffer (buffer, path):
+    if isinstance(buffer, MemmapReplayBuffer):
+        buffer.flush()
+    else:
+        torch.save(buffer, path)
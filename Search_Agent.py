@@ -0,0 +1,111 @@
+import time
+import numpy as np
+import Bitboard
+from Agent_Core import AgentCore
+from CONSTANTS import *
+
+
+class SearchAgent(AgentCore):
+    # במקום לבחור מהלך אחד לפי הקיו, מחפש את הסדר והמיקומים הטובים ביותר לכל הבלוקים שנשארו בתור הנוכחי.
+    # חיפוש beam: בכל עומק כל הילדים מוערכים במעבר אחד ברשת, ורק beam_width הטובים ממשיכים לעומק הבא.
+    # לוח שמגיעים אליו בכמה סדרים שונים באותו עומק מוערך פעם אחת. QCache בין חיפושים אופציונלי (SEARCH_TABLE_SIZE)
+    def __init__(self, model=None, train=False, env=None, beam_width=SEARCH_BEAM_WIDTH,
+                 time_budget=SEARCH_TIME_BUDGET, table_size=SEARCH_TABLE_SIZE, seed=None):
+        super().__init__(model=model, train=train, env=env, q_cache_size=table_size, seed=seed)
+        self.beam_width = beam_width
+        self.time_budget = time_budget  # שניות לכל חיפוש
+        self.plan = []  # המשך התוכנית מהחיפוש האחרון: (block, pos, הלוח הצפוי לפני המהלך)
+
+    def load_model(self, file):
+        super().load_model(file)
+        self.plan = []
+
+    def get_action_train(self, state, epoch=0):
+        if self.train and self.rng.random() < self.get_epsilon(epoch):
+            return super().get_action_train(state, epoch)
+
+        move = self.next_planned_move(state)
+        if move is None:
+            move = self.search(state)
+        after_state_tensors, _ = self.env.BatchAfterStates(state, [move])
+        return self.move_to_action(move), after_state_tensors[0]
+
+    def next_planned_move(self, state):  # המהלך הבא מהתוכנית, אם הלוח והבלוקים הם מה שהחיפוש ציפה להם
+        if not self.plan:
+            return None
+        block, pos, bits = self.plan[0]
+        if self.env.occupancy(state) != bits or block not in state.Blocks:  # state.bits קיים רק במצב bitboard
+            self.plan = []
+            return None
+        self.plan.pop(0)
+        return block, pos
+
+    def expand(self, blocks, level):  # כל הילדים של כל הצמתים בעומק הנוכחי, לכל בלוק שנשאר ולכל מיקום חוקי שלו
+        children = []
+        for b, block in enumerate(blocks):
+            nodes = np.flatnonzero(level["remaining"] & (1 << b))
+            if len(nodes) == 0:
+                continue
+            masks, _ = Bitboard.mask_table(block.shape)
+            legal = (masks[None, :] & level["bits"][nodes, None]) == 0  # (צמתים, מיקומים)
+            node_idx, pos_idx = np.nonzero(legal)
+            if len(node_idx) == 0:
+                continue
+            parents = nodes[node_idx]
+            placed = masks[pos_idx]
+            after_bits, _, cleared = Bitboard.clear_lines_batch(placed | level["bits"][parents])
+            boards = level["boards"][parents]
+            boards[Bitboard.unpack(placed)] = block.color_id
+            boards[Bitboard.unpack(cleared)] = 0
+            depth = level["depth"]
+            path = level["path"][parents]
+            path[:, depth, 0] = b
+            path[:, depth, 1] = pos_idx
+            path_bits = level["path_bits"][parents]
+            path_bits[:, depth] = level["bits"][parents]  # הלוח לפני המהלך, בשביל לבדוק את התוכנית בתור הבא
+            children.append((after_bits, boards, level["remaining"][parents] & ~(1 << b), path, path_bits))
+        if not children:
+            return None
+
+        bits, boards, remaining, path, path_bits = (np.concatenate(parts) for parts in zip(*children))
+        # אותו לוח עם אותם בלוקים שנשארו, שהגיעו אליו בסדר אחר, נשאר פעם אחת
+        keys = np.concatenate([boards, remaining[:, None].astype(np.uint8)], axis=1)
+        _, unique = np.unique(keys.view(np.dtype((np.void, keys.shape[1]))).ravel(), return_index=True)
+        unique.sort()
+        return dict(bits=bits[unique], boards=boards[unique], remaining=remaining[unique],
+                    path=path[unique], path_bits=path_bits[unique], depth=level["depth"] + 1)
+
+    def search(self, state):  # מחזיר את המהלך הראשון של הרצף הטוב ביותר ושומר את שאר הרצף כתוכנית
+        start = time.perf_counter()
+        blocks = sorted(state.Blocks, key=lambda block: block.color_id)  # סדר קבוע, לא תלוי בסדר של הסט
+        n = len(blocks)
+        level = dict(
+            bits=np.array([self.env.occupancy(state)], dtype=np.uint64),
+            boards=state.Board.reshape(1, 64).astype(np.uint8),
+            remaining=np.array([(1 << n) - 1], dtype=np.int64),
+            path=np.zeros((1, n, 2), dtype=np.int64),  # לכל עומק: (אינדקס הבלוק, אינדקס המיקום)
+            path_bits=np.zeros((1, n), dtype=np.uint64),
+            depth=0,
+        )
+        best = None  # (הרמה, אינדקס הצומת) של הרצף הטוב ביותר עד עכשיו
+        while level["depth"] < n:
+            children = self.expand(blocks, level)
+            if children is None:  # אף בלוק לא נכנס באף צומת, נשארים עם הרמה הקודמת
+                break
+            values = self.board_values(children["boards"])
+            order = np.argsort(-values, kind="stable")
+            level = {key: (value[order[:self.beam_width]] if isinstance(value, np.ndarray) else value)
+                     for key, value in children.items()}
+            best = level
+            if time.perf_counter() - start > self.time_budget:  # נגמר הזמן, ממשיכים עם הרצף הטוב ביותר שנמצא
+                break
+
+        path, path_bits = best["path"][0], best["path_bits"][0]
+        moves = []
+        for depth in range(best["depth"]):
+            block = blocks[path[depth, 0]]
+            pos = Bitboard.mask_table(block.shape)[1][path[depth, 1]]
+            moves.append((block, pos, int(path_bits[depth])))
+        self.plan = moves[1:]
+        block, pos, _ = moves[0]
+        return block, pos
@@ -1,21 +1,74 @@
 import numpy as np
 import torch
-import copy
+import Bitboard
 
 class State:
+    __slots__ = ("Board", "bits", "row_counts", "col_counts", "Blocks", "score", "combo_count",
+                 "turns_since_last_explosion", "in_combo", "moves", "lines_cleared", "max_combo",
+                 "legal_moves", "legal_bits", "playable_blocks")
+
     def __init__(self):
-        self.Board = np.zeros((8, 8)) # הלוח
-        self.Blocks = () # בלוקים זמינים
+        self.Board = np.zeros((8, 8), dtype=np.uint8) # הלוח (מספר הצבע בכל משבצת, 0 ריקה)
+        self.bits = 0 # הלוח כמספר של 64 ביט (ביט לכל משבצת מלאה)
+        self.row_counts = [0] * 8 # כמה משבצות מלאות יש בכל שורה, מתעדכן בהנחה ובפיצוץ
+        self.col_counts = [0] * 8 # כמה משבצות מלאות יש בכל עמודה
+        # בלוקים זמינים. נשארים אובייקטי Block ולא אינדקסים של צורות: המתאמים של המסך גוררים את ה rect של הבלוק,
+        # והסוכנים ו legal_moves מזהים את הבלוק עצמו. הצורה של כל בלוק זמינה כ block.shape_id
+        self.Blocks = ()
         self.score = 0 # ניקוד
         self.combo_count = 0 # מספר הקומבו
         self.turns_since_last_explosion = 0 # כמה תורות היו מאז  הפיצוץ האחרון
         self.in_combo = False # האם השחקן בקומבו כרגע
+        self.moves = 0 # כמה מהלכים בוצעו במשחק
+        self.lines_cleared = 0 # כמה שורות ועמודות פוצצו במשחק
+        self.max_combo = 0 # הקומבו הגבוה ביותר במשחק
+        self.legal_moves = None # מטמון: לכל בלוק מערך בוליאני של המיקומים החוקיים שלו
+        self.legal_bits = None # הלוח שעבורו חושב המטמון
+        self.playable_blocks = 0 # כמה בלוקים עדיין אפשר להניח על הלוח
+
+    def __getstate__(self): # pickle ו deepcopy: מילון של השדות, באותו פורמט של קבצים ישנים
+        return {name: getattr(self, name) for name in self.__slots__}
 
-    def TensorState(self, Board): # PyTorch ממיר את הלוח למבנה טנסור של 
-        tensor_state = torch.tensor(Board, dtype=torch.float32)        
+    def __setstate__(self, state): # מקבל גם מצב מקובץ ישן (לפני __slots__, למשל Model21 שנשמר כמודל שלם)
+        self.__init__()
+        for name, value in state.items():
+            if name in self.__slots__:  # שדות שכבר לא קיימים (Current_State, All_Moves...) לא נטענים
+                setattr(self, name, value)
+        self.Board = np.asarray(self.Board).astype(np.uint8)
+        if "bits" not in state:
+            self.bits = Bitboard.from_board(self.Board)
+        if "row_counts" not in state:  # המונים נגזרים מהלוח
+            filled = self.Board != 0
+            self.row_counts = filled.sum(axis=1).tolist()
+            self.col_counts = filled.sum(axis=0).tolist()
+
+    def TensorState(self, Board): # PyTorch ממיר את הלוח למבנה טנסור של
+        tensor_state = torch.tensor(Board, dtype=torch.float32)
         return tensor_state
-    
-    def copy(self): # יוצר עותק מדויק של המצב הנוכחי 
-        return copy.deepcopy(self)
-        
+
+    def copy(self, legal=True): # עותק של המצב: הלוח, אוסף הבלוקים והמטמון מועתקים, אובייקטי הבלוקים עצמם משותפים
+        # legal=False: בלי מטמון המהלכים החוקיים, למשל לעותק שמיד מניחים עליו בלוק והמטמון שלו ממילא לא תקף
+        new = State.__new__(State)
+        new.Board = self.Board.copy()
+        new.bits = self.bits
+        new.row_counts = self.row_counts.copy()
+        new.col_counts = self.col_counts.copy()
+        new.Blocks = set(self.Blocks) if isinstance(self.Blocks, set) else self.Blocks
+        new.score = self.score
+        new.combo_count = self.combo_count
+        new.turns_since_last_explosion = self.turns_since_last_explosion
+        new.in_combo = self.in_combo
+        new.moves = self.moves
+        new.lines_cleared = self.lines_cleared
+        new.max_combo = self.max_combo
+        # המערכים במטמון מתעדכנים במקום (update_legal_cache), לכן לכל עותק מערכים משלו
+        if legal and self.legal_moves is not None:
+            new.legal_moves = {block: moves.copy() for block, moves in self.legal_moves.items()}
+            new.legal_bits = self.legal_bits
+            new.playable_blocks = self.playable_blocks
+        else:
+            new.legal_moves = None
+            new.legal_bits = None
+            new.playable_blocks = 0
+        return new
 
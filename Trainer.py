@@ -1,11 +1,15 @@
 import pygame
-from Graphics2 import Graphics
+from Render_Process import RenderProcess
 from State2 import State
 from Environment2 import Environment
 from Ai_Agent2 import Ai_Agent
-from Replay_Buffer import ReplayBuffer
+from Replay_Buffer import make_buffer, save_buffer
+from Model import DQNLearner, compile_learner
+from Profiler import StageTimer, ProfileWindow
+from Metrics import make_logger
+from Game_Stats import GameStats
+import time
 import torch
-import wandb
 from CONSTANTS import *
 
 class Game:
@@ -13,7 +17,7 @@ class Game:
         pass
 
     def train(self):
-        graphics = Graphics()
+        renderer = RenderProcess()  # ציור בתהליך נפרד (TRAIN_RENDER), האימון לא מחכה לו
         env = Environment(State())  # יצירת הסביבה עם מצב התחלתי
         num = DEFAULT_MODEL_NUMBER  # מספר המודל
         Buffer_Path = BUFFER_PATH_TEMPLATE.format(num)  # Bufferנתיב לשמירת ה
@@ -22,8 +26,9 @@ class Game:
         player = Ai_Agent()  # סוכן בינה מלאכותית ראשי
         player_hat = Ai_Agent()  # מודל יעד (target network)
         player_hat.model.load_state_dict(player.model.state_dict())  # העתקת פרמטרים למודל היעד
+        learner = compile_learner(DQNLearner(player.model, player_hat.model))  # צעד הלמידה, משתף את הפרמטרים עם שני המודלים
         batch_size = BATCH_SIZE  # גודל אוסף החוויות לאימון
-        buffer = ReplayBuffer(path=None)  # יוצר Buffer חדש לצורך שמירת חוויות במהלך האימון
+        buffer = make_buffer(path=None)  # יוצר Buffer חדש לצורך שמירת חוויות במהלך האימון
         learning_rate = LEARNING_RATE  # שיעור למידה לשיפועי האופטימייזר
         epochs = NUM_EPOCHS  # מספר חזרות על לולאת האימון
         start_epoch = 0  # מספר החזרה להתחלה, שימושי אם רוצים להמשיך אימון קיים
@@ -36,11 +41,9 @@ class Game:
         step = 0  # סופר צעדים 
         episode_rewards = []  # רשימת תגמולים לכל שמירה
         
-        wandb_run = wandb.init(  # אתחול ריצה ב wandb
-            project=WANDB_PROJECT,
-            resume=False, 
-            id=f'Block_Blast_{num}', # מספר השמירה
-            config={  # wandbכל הערכים האלה ישמרו כפרמטרים ב
+        metrics = make_logger(  # מדדי האימון נכתבים ברקע ל METRICS_BACKENDS (מקומי כברירת מחדל, wandb אופציונלי)
+            run_id=f'Block_Blast_{num}', # מספר השמירה
+            config={  # כל הערכים האלה ישמרו כפרמטרים של הריצה
                 "name": f"Block_Blast_{num}",
                 "checkpoint_path": Model_Path,
                 "buffer_path": Buffer_Path,
@@ -58,74 +61,87 @@ class Game:
                 "C": C,
             },
         )
-        torch.save(player.model, Model_Path)  # שמירת המודל ההתחלתי
+        torch.save(player.model.state_dict(), Model_Path)  # שמירת המודל ההתחלתי (רק המשקלים)
+
+        timer = StageTimer(log=lambda values: metrics.log(values, step=step))  # זמני כל שלב בצעד, כבוי כברירת מחדל (PROFILE_STAGES), עם מונה הצעדים הנוכחי
+        player.timer = timer
+        profile_window = ProfileWindow()  # cProfile / torch.profiler על חלון של צעדים (PROFILER)
+        stats = GameStats()  # תוצאות כל המשחקים, נכתבות ל game_stats.db בבאצ'ים
 
         env.reset()  # אתחול הסביבה
             
         for epoch in range(epochs):  # לולאה על אפוקים
             state = env.state.copy()  # העתקת מצב התחלתי
             episode_reward = 0  # איפוס תגמול לריצה הנוכחית
+            episode_start = time.perf_counter()  # בשביל משך המשחק
+            renderer.start_episode(epoch)  # מציירים רק כל TRAIN_RENDER_EVERY משחקים
             while True:  # לולאת צעדים בתוך ריצה
-                for event in pygame.event.get():  # טיפול באירועי pygame
-                    if event.type == pygame.QUIT:  # אם סוגרים את החלון
+                profile_window.step()
+                with timer.stage("events"):
+                    if renderer.stopped:  # סגרו את החלון או לחצו על כפתור הסגירה בתהליך הציור
+                        renderer.close()
                         pygame.quit()  # יציאה מ-pygame
                         return  # סיום הפונקציה
-                    
-                    if event.type == pygame.MOUSEBUTTONDOWN:  # לחיצה בעכבר
-                        close_button_rect = graphics.get_close_button_rect()  # מיקום כפתור סגירה
-                        if close_button_rect.collidepoint(event.pos):  # בדיקה אם נלחץ הכפתור
-                            pygame.quit()  # יציאה מ-pygame
-                            return  # סיום הפונקציה
                 
-                graphics.draw_game(env.state, player.selected_block)  # ציור המשחק על המסך
-                pygame.display.flip()  # רענון התצוגה
+                with timer.stage("render"):
+                    renderer.submit(env.state, player.selected_block)  # צילום של המצב לתהליך הציור, לכל היותר TRAIN_RENDER_FPS בשנייה
                     
+                # moves, after_states ו forward נמדדים בתוך הסוכן
                 action, after_state_tensor = player.get_action_train(state=env.state, epoch=epoch)  # קבלת פעולה מה-agent
-                env.move(action=action, state=env.state)  # ביצוע המהלך בסביבה
-                done = env.is_game_over(env.state)  # בדיקה אם המשחק הסתיים
-                reward = env.Get_Reward_Args(action=action, state=env.state)  # חישוב תגמול עבור המהלך
-                episode_reward += reward  # עדכון תגמול הריצה
-                next_state = env.state.copy()  # מצב לאחר המהלך
+                with timer.stage("env"):
+                    env.move(action=action, state=env.state)  # ביצוע המהלך בסביבה
+                    done = env.is_game_over(env.state)  # בדיקה אם המשחק הסתיים
+                    reward = env.Get_Reward_Args(action=action, state=env.state)  # חישוב תגמול עבור המהלך
+                    episode_reward += reward  # עדכון תגמול הריצה
+                    next_state = env.state.copy()  # מצב לאחר המהלך
                 
-                state_tensor = state.TensorState(state.Board).view(1, 8, 8)  # המרת מצב לטנסור כניסה
-                next_state_tensor = next_state.TensorState(next_state.Board).view(1, 8, 8)  # טנסור למצב הבא
+                with timer.stage("push"):
+                    state_tensor = state.TensorState(state.Board).view(1, 8, 8)  # המרת מצב לטנסור כניסה
+                    next_state_tensor = next_state.TensorState(next_state.Board).view(1, 8, 8)  # טנסור למצב הבא
                 
-                block, (pixel_x, pixel_y) = action  # פירוק הפעולה לרכיבים
-                action_tensor = torch.tensor([pixel_x, pixel_y], dtype=torch.float32).view(1, 2)  # המרת פעולה לטנסור
-                reward_tensor = torch.tensor(reward, dtype=torch.float32).view(1, 1)  # טנסור תגמול
-                done_tensor = torch.tensor(done, dtype=torch.float32).view(1, 1)  # טנסור דגל סיום
+                    block, (pixel_x, pixel_y) = action  # פירוק הפעולה לרכיבים
+                    action_tensor = torch.tensor([pixel_x, pixel_y], dtype=torch.float32).view(1, 2)  # המרת פעולה לטנסור
+                    reward_tensor = torch.tensor(reward, dtype=torch.float32).view(1, 1)  # טנסור תגמול
+                    done_tensor = torch.tensor(done, dtype=torch.float32).view(1, 1)  # טנסור דגל סיום
                 
-                buffer.push(state_tensor, action_tensor, reward_tensor, 
-                            next_state_tensor, done_tensor)  # דחיפת הדוגמה ל-buffer
+                    buffer.push(state_tensor, action_tensor, reward_tensor, 
+                                next_state_tensor, done_tensor)  # דחיפת הדוגמה ל-buffer
                 
                 state = next_state  # עדכון המצב הנוכחי
+                timer.step(sampled=not done and len(buffer) >= MIN_BUFFER_SIZE_FOR_TRAINING)  # דיווח כל PROFILE_REPORT_EVERY צעדים
                 
                 if done:  # טיפול בסיום ריצה
                     scores.append(env.state.score)  # שמירת הציון ברשימה
                     episode_rewards.append(episode_reward)  # שמירת תגמול הריצה
-                    wandb.log({  # רישום למדדים ב-wandb
+                    stats.record(env.state, time.perf_counter() - episode_start, num)  # שמירת תוצאות המשחק
+                    metrics.log({  # רישום המדדים
                         "episode_reward": episode_reward,
                         "score": env.state.score,
                         "epoch": epoch,
-                        "step": step,
-                    })
+                    }, step=step)
                     break  # יציאה מלולאת הצעדים
                 
                 if len(buffer) < MIN_BUFFER_SIZE_FOR_TRAINING:  # אם אין מספיק דוגמאות בחוצץ
                     continue  # המשך לאסוף עוד דוגמאות
 
-                states, actions, rewards, next_states, dones = buffer.sample(batch_size)  # דגימה מה buffer
-                Q_values = player.Q(states, actions)  # חישוב הקיו עבור המצבים הנוכחיים
-                next_actions, Q_hat_Values = player_hat.get_Actions_Values(next_states)  # חישוב פעולות וקיו של ה target
-
-                loss = player.model.loss(Q_values, rewards, Q_hat_Values, dones)  # השגיאה
+                with timer.stage("sample"):
+                    weights = None  # משקלי importance sampling, רק ב buffer עם עדיפויות
+                    if buffer.prioritized:
+                        states, actions, rewards, next_states, dones, indices, weights = buffer.sample(batch_size)  # דגימה לפי עדיפות
+                    else:
+                        states, actions, rewards, next_states, dones = buffer.sample(batch_size)  # דגימה מה buffer
+                with timer.stage("loss"):
+                    loss, td_errors = learner(states, rewards, next_states, dones, weights)  # קיו, קיו של ה target והשגיאה בקריאה אחת
+                    if buffer.prioritized:  # עדכון העדיפויות של כל הבאצ' בבת אחת
+                        buffer.update_priorities(indices, td_errors.numpy())
                 losses.append(loss.item())  # שמירת ערך השגיאה ברשימה
-                wandb.log({"loss": loss.item(), "step": step})  # שמירת השגיאה ב wandb
+                metrics.log({"loss": losses[-1]}, step=step)  # שמירת השגיאה
                                 
-                loss.backward()  # מעבר לאחור לחישוב גרדיאנטים
-                optim.step()  # עדכון פרמטרים באופטימייזר
-                optim.zero_grad()  # איפוס גרדיאנטים לפני צעד הבא
-                scheduler.step()  # עדכון שיעור הלמידה לפי מתזמן
+                with timer.stage("backprop"):
+                    loss.backward()  # מעבר לאחור לחישוב גרדיאנטים
+                    optim.step()  # עדכון פרמטרים באופטימייזר
+                    optim.zero_grad()  # איפוס גרדיאנטים לפני צעד הבא
+                    scheduler.step()  # עדכון שיעור הלמידה לפי מתזמן
 
                 if epoch % C == 0:  # כל C אפוקים מעדכנים את מודל היעד
                     player_hat.model.load_state_dict(player.model.state_dict())  # העתקת הפרמטרים
@@ -144,23 +160,23 @@ class Game:
                 print(f"Epsilon: {epsilon:.4f}")
                 print(f"Buffer Size: {len(buffer)}")
                 print(f"Best Score: {max(scores) if scores else 0}")
-                wandb.log({  # רישום ממוצעים ל wandb
+                metrics.log({  # רישום ממוצעים
                     "avg_score": avg_score,
                     "avg_reward": avg_reward,
                     "avg_loss": avg_loss,
                     "epsilon": epsilon,
                     "best_score": max(scores) if scores else 0,
-                })
+                }, step=step)
                 torch.save(player.model.state_dict(), Model_Path)  # שמירת המודל
-                torch.save(buffer, "Data/Buffer.pth")  # שמירת ה buffer
+                save_buffer(buffer, "Data/Buffer.pth")  # שמירת ה buffer
             
             
             
             env.reset()       
-        try:
-            wandb_run.finish()
-        except Exception:
-            pass
+        profile_window.finish()  # אם האימון נגמר באמצע החלון
+        stats.close()  # כותב את המשחקים שעוד לא נכתבו
+        metrics.close()  # כותב את מה שנשאר בתור וסוגר את ה sinks
+        renderer.close()
 
 if __name__ == "__main__":
     game = Game()
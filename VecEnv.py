@@ -0,0 +1,187 @@
+import numpy as np
+import torch
+import Bitboard
+from Block import SHAPES, ENTRY_SHAPE
+from CONSTANTS import *
+
+# טבלה אחת של כל המיקומים של כל הצורות בקטלוג (בלי כפילויות), לפי הסדר של Block.SHAPES
+SHAPE_LIST = SHAPES
+_tables = [Bitboard.mask_table(shape) for shape in SHAPE_LIST]
+SHAPE_COUNT = np.array([len(masks) for masks, _ in _tables])  # כמה מיקומים יש לכל צורה
+SHAPE_START = np.concatenate(([0], np.cumsum(SHAPE_COUNT)[:-1]))  # איפה מתחילים המיקומים של כל צורה בטבלה
+TABLE_MASKS = np.concatenate([masks for masks, _ in _tables])
+TABLE_POSITIONS = np.array([pos for _, positions in _tables for pos in positions])  # (x, y) לכל שורה בטבלה
+
+
+def _span_masks(shape, positions, lines, axis):  # איחוד השורות/העמודות שהצורה מכסה בכל מיקום
+    size = len(shape) if axis == 1 else len(shape[0])
+    spans = []
+    for pos in positions:
+        start = pos[axis]
+        mask = 0
+        for i in range(start, start + size):
+            mask |= lines[i]
+        spans.append(mask)
+    return spans
+
+
+TABLE_ROW_SPANS = np.array([m for shape, (_, positions) in zip(SHAPE_LIST, _tables)
+                            for m in _span_masks(shape, positions, Bitboard.ROW_MASKS, 1)], dtype=np.uint64)
+TABLE_COL_SPANS = np.array([m for shape, (_, positions) in zip(SHAPE_LIST, _tables)
+                            for m in _span_masks(shape, positions, Bitboard.COL_MASKS, 0)], dtype=np.uint64)
+
+
+def popcount(boards):  # כמות הביטים הדולקים בכל לוח במערך
+    return Bitboard.unpack(boards).sum(axis=1)
+
+
+class VecBlockBlastEnv:  # B משחקים במקביל כמערכי numpy, צעד אחד מקדם את כולם ומתחיל מחדש משחקים שנגמרו
+    def __init__(self, num_envs, seed=None):
+        self.num_envs = num_envs
+        self.rng = np.random.default_rng(seed)
+
+        self.bits = np.zeros(num_envs, dtype=np.uint64)  # הלוחות כמספרים של 64 ביט
+        self.boards = np.zeros((num_envs, 64), dtype=np.float32)  # לוחות הצבעים, כמו State.Board
+        self.pieces = np.full((num_envs, NUM_BLOCKS_PER_TURN), -1, dtype=np.int64)  # אינדקס הצורה בכל תא, -1 אם הונח
+        self.scores = np.zeros(num_envs, dtype=np.int64)
+        self.combo_count = np.zeros(num_envs, dtype=np.int64)
+        self.turns_since_last_explosion = np.zeros(num_envs, dtype=np.int64)
+        self.in_combo = np.zeros(num_envs, dtype=bool)
+        self.moves = np.zeros(num_envs, dtype=np.int64)  # כמה מהלכים בוצעו במשחק הנוכחי
+
+        self.candidates = None  # המהלכים שחושבו בקריאה האחרונה ל after_states
+        self.reset()
+
+    def reset(self, envs=None):  # מאתחל את כל המשחקים, או רק את אלה שב envs
+        if envs is None:
+            envs = np.arange(self.num_envs)
+        self.bits[envs] = 0
+        self.boards[envs] = 0
+        self.scores[envs] = 0
+        self.combo_count[envs] = 0
+        self.turns_since_last_explosion[envs] = 0
+        self.in_combo[envs] = False
+        self.moves[envs] = 0
+        self._draw_pieces(envs)
+
+    def keep(self, envs):  # משאיר רק את המשחקים שב envs, למשל בהערכה כשמשחק כבר לא נספר ואין טעם להמשיך לשחק בו
+        for name in ("bits", "boards", "pieces", "scores", "combo_count", "turns_since_last_explosion", "in_combo", "moves"):
+            setattr(self, name, getattr(self, name)[envs])
+        self.num_envs = len(envs)
+        self.candidates = None
+
+    def _draw_pieces(self, envs):  # שלוש כניסות שונות של BLOCK_SHAPES לכל משחק, כמו ב Engine, ממופות לצורות בקטלוג
+        if len(envs) == 0:
+            return
+        keys = self.rng.random((len(envs), len(ENTRY_SHAPE)))
+        self.pieces[envs] = ENTRY_SHAPE[np.argsort(keys, axis=1)[:, :NUM_BLOCKS_PER_TURN]]
+
+    def observations(self):  # הלוחות הנוכחיים כטנסור (B,1,8,8)
+        return torch.from_numpy(self.boards.copy()).view(self.num_envs, 1, 8, 8)
+
+    def _candidate_rows(self):  # כל השורות בטבלה עבור הצורות שנשארו בכל משחק, לפני בדיקת חוקיות
+        flat = self.pieces.ravel()
+        counts = np.where(flat >= 0, SHAPE_COUNT[np.maximum(flat, 0)], 0)
+        total = counts.sum()
+        segment = np.repeat(np.arange(flat.size), counts)  # לאיזה (משחק, תא) שייכת כל שורה
+        first = np.cumsum(counts) - counts
+        rows = SHAPE_START[np.maximum(flat, 0)][segment] + np.arange(total) - first[segment]
+        return rows, segment // NUM_BLOCKS_PER_TURN, segment % NUM_BLOCKS_PER_TURN
+
+    def legal_counts(self):  # כמה מהלכים חוקיים יש בכל משחק
+        rows, env, _ = self._candidate_rows()
+        legal = (TABLE_MASKS[rows] & self.bits[env]) == 0
+        return np.bincount(env[legal], minlength=self.num_envs)
+
+    def after_states(self):  # כל המצבים שאחרי כל המהלכים החוקיים של כל המשחקים בטנסור אחד
+        rows, env, slot = self._candidate_rows()
+        masks = TABLE_MASKS[rows]
+        legal = (masks & self.bits[env]) == 0
+        rows, env, slot, masks = rows[legal], env[legal], slot[legal], masks[legal]
+
+        after_bits, explosions, cleared = Bitboard.clear_lines_batch(masks | self.bits[env])
+
+        n = len(rows)
+        after_tensors = torch.empty((n, 1, 8, 8), dtype=torch.float32)
+        boards = after_tensors.numpy().reshape(n, 64)
+        boards[:] = self.boards[env]
+        np.copyto(boards, (slot + 1).astype(np.float32)[:, None], where=Bitboard.unpack(masks))  # צבע = מספר התא + 1
+        boards[Bitboard.unpack(cleared)] = 0
+
+        counts = np.bincount(env, minlength=self.num_envs)
+        self.candidates = dict(
+            rows=rows, env=env, slot=slot, masks=masks,
+            after_bits=after_bits, explosions=explosions, boards=boards,
+            offsets=np.cumsum(counts) - counts,  # איפה מתחילים המהלכים של כל משחק
+            counts=counts,
+        )
+        return after_tensors, self.candidates
+
+    def select_actions(self, q_values, epsilon=0.0):  # בוחר לכל משחק את המהלך עם הקיו הגבוה ביותר (או אקראי בהסתברות epsilon)
+        c = self.candidates
+        q = np.asarray(q_values, dtype=np.float64).reshape(-1)
+        offsets, counts = c["offsets"], c["counts"]
+        order = np.lexsort((-q, c["env"]))  # ממיין לפי משחק ואז לפי קיו יורד
+        best = order[offsets]
+        if epsilon > 0:
+            explore = self.rng.random(self.num_envs) < epsilon
+            random_pick = offsets + (self.rng.random(self.num_envs) * counts).astype(np.int64)
+            best = np.where(explore, random_pick, best)
+        return best
+
+    def step(self, actions):  # מבצע לכל משחק את המהלך שנבחר (אינדקס למהלכים מ after_states)
+        c = self.candidates
+        envs = c["env"][actions]
+        if not np.array_equal(envs, np.arange(self.num_envs)):
+            raise ValueError("step expects exactly one candidate per environment, in environment order")
+        masks = c["masks"][actions]
+        after_bits = c["after_bits"][actions]
+        n = c["explosions"][actions]
+        placed = popcount(masks)
+
+        # תגמול כמו Engine.Get_Reward, על הלוח שאחרי המהלך
+        affected = popcount(after_bits & TABLE_ROW_SPANS[c["rows"][actions]]) + \
+            popcount(after_bits & TABLE_COL_SPANS[c["rows"][actions]]) - placed * 2
+        rewards = placed * REWARD_SQUARES_PER_BLOCK + affected * REWARD_SQUARES_IN_SAME_ROW_OR_COL + n * REWARD_EXPLODE
+
+        self.bits = after_bits
+        self.boards = c["boards"][actions].copy()
+        self.scores += placed
+        self.moves += 1
+
+        # קומבו, כמו Engine.check_and_explode_rows
+        exploded = n > 0
+        self.turns_since_last_explosion = np.where(exploded, 0, self.turns_since_last_explosion + 1)
+        self.combo_count = np.where(exploded, np.where(self.in_combo, self.combo_count + n, n), self.combo_count)
+        self.scores += np.where(exploded, 10 * (n * self.combo_count + n * (n - 1) // 2), 0)
+        self.in_combo = self.in_combo | exploded
+        stale = ~exploded & (self.turns_since_last_explosion > 2)
+        self.in_combo[stale] = False
+        self.combo_count[stale] = 0
+
+        self.pieces[np.arange(self.num_envs), c["slot"][actions]] = -1
+        self._draw_pieces(np.flatnonzero((self.pieces < 0).all(axis=1)))
+
+        dones = self.legal_counts() == 0
+        info = dict(final_scores=self.scores[dones].copy(), final_moves=self.moves[dones].copy())
+        self.reset(np.flatnonzero(dones))  # מתחיל מחדש את המשחקים שנגמרו
+        self.candidates = None
+        return rewards, dones, info
+
+
+if __name__ == "__main__":
+    import time
+    from Model import DQN
+
+    vec = VecBlockBlastEnv(256, seed=0)
+    model = DQN()
+    steps, games, start = 0, 0, time.perf_counter()
+    while time.perf_counter() - start < 10:
+        after_tensors, _ = vec.after_states()
+        with torch.no_grad():
+            q_values = model(after_tensors)  # מעבר אחד ברשת לכל המהלכים של כל המשחקים
+        rewards, dones, info = vec.step(vec.select_actions(q_values.numpy(), epsilon=0.1))
+        steps += vec.num_envs
+        games += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    print(f"{steps / elapsed:.0f} steps/sec, {games / elapsed:.1f} games/sec")
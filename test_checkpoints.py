@@ -0,0 +1,14 @@
+import glob
+import torch
+from Agent_Core import load_weights
+from Model import DQN
+
+
+def test_shipped_checkpoints_load():  # כולל Model21, שנשמר כמודל שלם עם אובייקטים ישנים של State ו Block
+    paths = sorted(glob.glob("Data/Model*.ptn"))
+    assert "Data/Model21.ptn" in paths
+    for path in paths:
+        model = load_weights(path)
+        assert isinstance(model, DQN)
+        with torch.no_grad():
+            assert model(torch.zeros(2, 1, 8, 8)).shape == (2, 1)
@@ -0,0 +1,78 @@
+import random
+import numpy as np
+import Bitboard
+from Engine import Engine
+from State2 import State
+
+
+def by_color(state):  # הבלוקים לפי הצבע, כדי להשוות בין שתי סביבות שיש להן אובייקטים שונים של בלוקים
+    return {block.color_id: block for block in state.Blocks}
+
+
+def test_bitboard_matches_array_engine():  # אותם משחקים עם זרע קבוע בשני המצבים נותנים בדיוק אותן תוצאות
+    for game in range(20):
+        engines = [Engine(State(), bitboard=bitboard, log=None, seed=game) for bitboard in (True, False)]
+        for env in engines:
+            env.reset()
+        rng = random.Random(game)
+        while True:
+            fast, slow = (env.state for env in engines)
+            assert fast.bits == engines[1].occupancy(slow)  # במצב הרגיל state.bits לא מתעדכן, הלוח נגזר מהמערך
+            assert np.array_equal(fast.Board, slow.Board)
+            assert (fast.score, fast.combo_count, fast.in_combo, fast.turns_since_last_explosion) == \
+                   (slow.score, slow.combo_count, slow.in_combo, slow.turns_since_last_explosion)
+            assert (fast.row_counts, fast.col_counts) == (slow.row_counts, slow.col_counts)
+            assert engines[0].GetAllPossibleMoves(fast) == engines[1].GetAllPossibleMoves(slow)
+
+            fast_blocks, slow_blocks = by_color(fast), by_color(slow)
+            assert {c: b.shape for c, b in fast_blocks.items()} == {c: b.shape for c, b in slow_blocks.items()}
+            legal = []
+            for color in sorted(fast_blocks):
+                for y in range(-1, 9):
+                    for x in range(-1, 9):
+                        valid = engines[0].is_valid_move(fast, fast_blocks[color], (x, y))
+                        assert valid == engines[1].is_valid_move(slow, slow_blocks[color], (x, y))
+                        if valid:
+                            legal.append((color, (x, y)))
+
+            done = [env.is_game_over(env.state) for env in engines]
+            assert done[0] == done[1] == (not legal)
+            if done[0]:
+                break
+
+            color, pos = rng.choice(legal)
+            rewards = []
+            for env, blocks in zip(engines, (fast_blocks, slow_blocks)):
+                action = (blocks[color], pos)
+                env.move(env.state, action)
+                assert env.last_move_valid
+                rewards.append((env.Get_Reward_Args(env.state, action), env.num_explosions))
+            assert rewards[0] == rewards[1]
+
+
+def test_legal_cache_matches_recomputation():  # המטמון שמתעדכן בכל מהלך שווה תמיד לחישוב מאפס
+    for game in range(20):
+        env = Engine(State(), bitboard=True, log=None, seed=game)
+        env.reset()
+        rng = random.Random(game)
+        env.legal_cache(env.state)
+        for after_state in env.AfterState(env.state, env.GetAllPossibleMoves(env.state)[:50]):
+            assert after_state.legal_moves is None  # עותק בשביל מצב אחרי מהלך לא לוקח את המטמון
+        while not env.is_game_over(env.state):
+            state = env.state
+            cached = env.legal_cache(state)
+            fresh_state = state.copy(legal=False)
+            fresh = env.legal_cache(fresh_state)
+            assert cached.keys() == fresh.keys() == state.Blocks
+            for block in state.Blocks:
+                assert np.array_equal(cached[block], fresh[block])
+            assert state.playable_blocks == fresh_state.playable_blocks
+
+            copied = state.copy()  # עותק עם המטמון: מהלך על העותק לא משנה את המטמון של המקור
+            block = rng.choice(sorted((b for b in state.Blocks if cached[b].any()), key=lambda b: b.color_id))
+            positions = Bitboard.mask_table(block.shape)[1]
+            pos = positions[rng.choice(np.flatnonzero(cached[block]).tolist())]
+            env.move(copied, (block, pos))
+            assert np.array_equal(env.legal_cache(state)[block], fresh[block])
+            env.move(state, (block, pos))
+            assert env.last_move_valid